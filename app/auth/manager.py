@@ -11,7 +11,7 @@ from sqlalchemy.orm import Session
 from app.auth.providers.email import EmailProvider
 from app.auth.providers.whatsapp import WhatsAppProvider
 from app.auth.storage import AuthStorage
-from app.auth.utils import AuthUtils
+from app.auth.utils import AuthUtils, verify_invite_token
 from app.models import InviteCode, User
 
 @dataclass
@@ -91,7 +91,6 @@ class AuthManager:
                     logging.warning(f"🔍 Unregistered user attempted OTP without invite: {normalized_contact}")
                     return AuthResult(success=False, message="This contact is not registered. Please use a valid invite code.", error_code="USER_NOT_FOUND_NO_INVITE")
                 
-                from app.auth.utils import verify_invite_token
                 invite_data = verify_invite_token(invite_token)
                 invite = db.query(InviteCode).filter(InviteCode.invite_id == invite_data["invite_id"]).first()
                 if not invite or invite.is_used:
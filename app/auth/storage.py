@@ -1,7 +1,7 @@
 # app/auth/storage.py - COMPLETE FIXED VERSION
 import logging
 import re
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
@@ -11,6 +11,16 @@ import uuid
 # DEPRECATED: This will be phased out in favor of database storage
 new_user_otps: Dict[str, Dict] = {}
 
+def _utcnow() -> datetime:
+    """Timezone-aware current UTC time; OTP timestamps are compared against timestamptz columns."""
+    return datetime.now(timezone.utc)
+
+def _age(created_at: datetime) -> timedelta:
+    """Time since created_at; a naive value is taken as UTC, as datetime.utcnow() used to store it."""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return _utcnow() - created_at
+
 class AuthStorage:
     """Handles OTP storage for both existing and new users with enhanced logging and error handling"""
     
@@ -25,7 +35,7 @@ class AuthStorage:
             # Check for existing OTP and rate limiting
             existing_otp = db.query(OTPToken).filter(OTPToken.user_id == user_id).first()
             if existing_otp:
-                time_since_creation = datetime.utcnow() - existing_otp.created_at
+                time_since_creation = _age(existing_otp.created_at)
                 if time_since_creation < timedelta(minutes=1):
                     logging.warning(f"🔍 Rate limit hit for user {user_id}: {time_since_creation.total_seconds()} seconds ago")
                     return False
@@ -38,7 +48,7 @@ class AuthStorage:
             otp_token = OTPToken(
                 user_id=user_id, 
                 otp=otp, 
-                created_at=datetime.utcnow()
+                created_at=_utcnow()
             )
             db.add(otp_token)
             db.commit()
@@ -64,14 +74,14 @@ class AuthStorage:
             # For now, still use memory storage but with better error handling
             # TODO: Move to database storage with TempOTP table
             if normalized_contact in new_user_otps:
-                time_since_creation = datetime.utcnow() - new_user_otps[normalized_contact]['created_at']
+                time_since_creation = _age(new_user_otps[normalized_contact]['created_at'])
                 if time_since_creation < timedelta(minutes=1):
                     logging.warning(f"🔍 Rate limit hit for new user {normalized_contact}: {time_since_creation.total_seconds()} seconds ago")
                     return False
             
             new_user_otps[normalized_contact] = {
                 'otp': otp, 
-                'created_at': datetime.utcnow()
+                'created_at': _utcnow()
             }
             logging.info(f"✅ OTP stored successfully in memory for new user {normalized_contact}")
             return True
@@ -96,7 +106,7 @@ class AuthStorage:
                 return "NOT_FOUND", "No OTP found for this user. Please request one."
             
             # Check if OTP has expired (3 minutes)
-            time_since_creation = datetime.utcnow() - otp_token.created_at
+            time_since_creation = _age(otp_token.created_at)
             if time_since_creation > timedelta(minutes=3):
                 logging.warning(f"🔍 OTP expired for user {user_id}: {time_since_creation.total_seconds()} seconds old")
                 try:
@@ -140,7 +150,7 @@ class AuthStorage:
             stored_otp_data = new_user_otps[normalized_contact]
             
             # Check if OTP has expired (3 minutes)
-            time_since_creation = datetime.utcnow() - stored_otp_data['created_at']
+            time_since_creation = _age(stored_otp_data['created_at'])
             if time_since_creation > timedelta(minutes=3):
                 logging.warning(f"🔍 OTP expired for new user {normalized_contact}: {time_since_creation.total_seconds()} seconds old")
                 # Clean up expired OTP
@@ -191,7 +201,7 @@ class AuthStorage:
                 if invite:
                     invite.is_used = True
                     invite.user_id = user_id
-                    invite.used_at = datetime.utcnow()
+                    invite.used_at = _utcnow()
                     logging.info(f"🔍 Marked invite {invite_id} as used")
 
                 # Clean up memory storage
@@ -220,7 +230,7 @@ class AuthStorage:
         
         try:
             # Clean up database OTPs (older than 5 minutes)
-            expiry_time = datetime.utcnow() - timedelta(minutes=5)
+            expiry_time = _utcnow() - timedelta(minutes=5)
             expired_db_count = db.query(OTPToken).filter(
                 OTPToken.created_at < expiry_time
             ).delete()
@@ -233,7 +243,7 @@ class AuthStorage:
             # Clean up memory OTPs (older than 5 minutes)
             expired_contacts = []
             for contact, otp_data in new_user_otps.items():
-                if datetime.utcnow() - otp_data['created_at'] > timedelta(minutes=5):
+                if _age(otp_data['created_at']) > timedelta(minutes=5):
                     expired_contacts.append(contact)
             
             for contact in expired_contacts:
@@ -1,7 +1,7 @@
 # app/auth/utils.py
 import re
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 from app.models import User
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
@@ -47,13 +47,15 @@ class AuthUtils:
         """Find user by email or phone with flexible matching"""
         normalized_contact = self.normalize_contact_auto(contact)
         user = None
+        # Login reads user.chat right after this; join it in rather than lazy-loading it with a second SELECT
+        users = db.query(User).options(joinedload(User.chat))
         if "@" in normalized_contact:
-            user = db.query(User).filter(User.email == normalized_contact, User.status == 1).first()
+            user = users.filter(User.email == normalized_contact, User.status == 1).first()
         else:
             if normalized_contact and normalized_contact.isdigit():
                 try:
                     phone_number = int(normalized_contact)
-                    user = db.query(User).filter(User.phone_number == phone_number, User.status == 1).first()
+                    user = users.filter(User.phone_number == phone_number, User.status == 1).first()
                 except ValueError:
                     pass
         return user
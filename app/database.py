@@ -1,5 +1,7 @@
 # app/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import AppConfig
 
@@ -10,14 +12,34 @@ config = AppConfig.from_env()
 engine = create_engine(
     config.prompt_engine.supabase_connection_string,
     echo=False,
+    pool_size=config.database.pool_size,
+    max_overflow=config.database.max_overflow,
     pool_pre_ping=True,
-    pool_recycle=300,
-    connect_args={"sslmode": "require"},
-    execution_options={"compiled_cache": None}
+    pool_recycle=config.database.pool_recycle,
+    pool_timeout=config.database.pool_timeout,
+    connect_args={"sslmode": "require"}
+)
+
+# Async engine on the same database via asyncpg. asyncpg does not understand
+# libpq's sslmode parameter, and Supabase's pooler needs prepared statements off.
+async_url = make_url(config.prompt_engine.supabase_connection_string).set(
+    drivername="postgresql+asyncpg"
+).difference_update_query(["sslmode"]).update_query_dict({"prepared_statement_cache_size": "0"})
+
+async_engine = create_async_engine(
+    async_url,
+    echo=False,
+    pool_size=config.database.async_pool_size,
+    max_overflow=config.database.async_max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=config.database.pool_recycle,
+    pool_timeout=config.database.pool_timeout,
+    connect_args={"ssl": "require", "statement_cache_size": 0}
 )
 
 # Create a session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 # Base class for your SQLAlchemy models
 Base = declarative_base()
@@ -28,4 +50,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async counterpart for endpoints that run their queries on the event loop
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,8 +1,9 @@
 # app/endpoints/reflection.py - SIMPLIFIED VERSION
 
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.auth.utils import get_current_user
 from app.models import User, Reflection, Chat, Message
 from typing import List, Dict, Any
@@ -11,59 +12,71 @@ from datetime import datetime
 router = APIRouter(prefix="/reflection", tags=["reflection-history"])
 
 @router.get("/inbox")
-async def inbox(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def inbox(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Gets reflections received by the current user - ONLY SUMMARY."""
     try:
-        # Get reflections received by this user
-        received_reflections = db.query(Reflection).filter(
-            Reflection.receiver_user_id == current_user.user_id,
-            Reflection.is_delivered == 1  # Only delivered reflections
-        ).order_by(Reflection.created_at.desc()).all()
-        
+        # Get reflections received by this user, with the sender's user_id from Chat
+        result = await db.execute(
+            select(Reflection, Chat.user_id).join(Chat).where(
+                Reflection.receiver_user_id == current_user.user_id,
+                Reflection.is_delivered == 1  # Only delivered reflections
+            ).order_by(Reflection.created_at.desc())
+        )
+        received_reflections = result.all()
+    
+        # Only rows that are neither anonymous nor carry a sender_name need the sender's profile name
+        unresolved_user_ids = {
+            sender_user_id for reflection, sender_user_id in received_reflections
+            if not reflection.is_anonymous and not reflection.sender_name
+        }
+        sender_names = {}
+        if unresolved_user_ids:
+            result = await db.execute(
+                select(User.user_id, User.name).where(User.user_id.in_(unresolved_user_ids))
+            )
+            sender_names = dict(result.all())
+    
         data = []
-        for reflection in received_reflections:
-            # Get the sender information
-            sender_chat = db.query(Chat).filter(Chat.chat_id == reflection.chat_id).first()
-            sender_user = db.query(User).filter(User.user_id == sender_chat.user_id).first() if sender_chat else None
-            
+        for reflection, sender_user_id in received_reflections:
             # Determine sender name
             if reflection.is_anonymous:
                 sender_display_name = "Anonymous"
             elif reflection.sender_name:
                 sender_display_name = reflection.sender_name
-            elif sender_user and sender_user.name:
-                sender_display_name = sender_user.name
             else:
-                sender_display_name = "Anonymous"
-            
+                sender_display_name = sender_names.get(sender_user_id) or "Anonymous"
+        
             data.append({
                 "reflection_id": str(reflection.reflection_id),
                 "summary": reflection.summary or "No summary available",  # ONLY SUMMARY
                 "from": sender_display_name,
                 "created_at": reflection.created_at.isoformat() if reflection.created_at else None
             })
-        
+    
         return {
             "success": True, 
             "data": data
         }
-        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch inbox: {str(e)}")
 
+
 @router.get("/outbox")
-async def outbox(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def outbox(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
     """Gets reflections sent by the current user."""
     try:
         # Get reflections sent by this user
-        sent_reflections = db.query(Reflection).join(Chat).filter(
-            Reflection.summary.isnot(None),
-            Chat.user_id == current_user.user_id,
-            Reflection.is_delivered.in_([1, 3])  # Delivered or Completed
-        ).order_by(Reflection.created_at.desc()).all()
-        
+        result = await db.execute(
+            select(Reflection).join(Chat).where(
+                Reflection.summary.isnot(None),
+                Chat.user_id == current_user.user_id,
+                Reflection.is_delivered.in_([1, 3])  # Delivered or Completed
+            ).order_by(Reflection.created_at.desc())
+        )
+        sent_reflections = result.scalars().all()
+    
         status_map = {0: "In Progress", 1: "Delivered", 2: "Blocked", 3: "Completed"}
-        
+    
         data = []
         for reflection in sent_reflections:
             data.append({
@@ -73,19 +86,19 @@ async def outbox(current_user: User = Depends(get_current_user), db: Session = D
                 "status": status_map.get(reflection.is_delivered, "Unknown"),
                 "created_at": reflection.created_at.isoformat() if reflection.created_at else None
             })
-        
+    
         return {
             "success": True,
             "data": data
         }
-        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch outbox: {str(e)}")
 
+
 @router.get("/history")
 async def history(
     current_user: User = Depends(get_current_user), 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     page: int = Query(1, ge=1),
     limit: int = Query(2, ge=1, le=10)  # Default 2 reflections per page, max 10
 ):
@@ -97,20 +110,26 @@ async def history(
     """
     try:
         offset = (page - 1) * limit
-        
+    
         # Get ONLY sent reflections by this user (NOT received ones)
-        sent_reflections = db.query(Reflection).join(Chat).filter(
-            Chat.user_id == current_user.user_id
-        ).order_by(Reflection.created_at.desc()).all()
-        
+        result = await db.execute(
+            select(Reflection).join(Chat).where(
+                Chat.user_id == current_user.user_id
+            ).order_by(Reflection.created_at.desc())
+        )
+        sent_reflections = result.scalars().all()
+    
         # Process sent reflections - INCLUDE FULL CHAT HISTORY
         all_reflections = []
         for reflection in sent_reflections:
             # Get ALL messages for this reflection (user + system)
-            chat_messages = db.query(Message).filter(
-                Message.reflection_id == reflection.reflection_id
-            ).order_by(Message.created_at.asc()).all()
-            
+            result = await db.execute(
+                select(Message).where(
+                    Message.reflection_id == reflection.reflection_id
+                ).order_by(Message.created_at.asc())
+            )
+            chat_messages = result.scalars().all()
+        
             # Convert messages to proper format
             chat_history = []
             for msg in chat_messages:
@@ -121,7 +140,7 @@ async def history(
                     "is_distress": msg.is_distress,
                     "created_at": msg.created_at.isoformat() if msg.created_at else None
                 })
-            
+        
             reflection_data = {
                 "reflection_id": str(reflection.reflection_id),
                 "summary": reflection.summary or "No summary available",
@@ -133,10 +152,10 @@ async def history(
                 "chat_history": chat_history  # FULL CHAT INCLUDED
             }
             all_reflections.append(reflection_data)
-        
+    
         # Apply pagination
         paginated_reflections = all_reflections[offset:offset + limit]
-        
+    
         return {
             "success": True,
             "total": len(all_reflections),
@@ -145,6 +164,5 @@ async def history(
             "has_more": (offset + limit) < len(all_reflections),  # For frontend scroll detection
             "data": paginated_reflections
         }
-        
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch history: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to fetch history: {str(e)}")
@@ -1,17 +1,47 @@
 # app/handlers/database.py (FIXED)
+import asyncio
+from sqlalchemy import update, select, insert, func, bindparam
 from sqlalchemy.orm import Session
 from app.models import Reflection, Message, Chat, User
 import uuid
 from typing import Optional
 from datetime import datetime, timedelta, timezone
 import logging
+import threading
 
+async def run_sync(fn, *args, **kwargs):
+    """
+    Run a blocking db_handler call in a worker thread so it doesn't stall the event loop.
+    Calls that share a Session must still be awaited one at a time - Session is not thread-safe.
+    """
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+# Every chat history row takes created_at from this process's clock, strictly increasing, so rows
+# written directly and rows written later by the write-behind queue sort in the order they happened
+_message_clock_lock = threading.Lock()
+_last_message_time = datetime.min.replace(tzinfo=timezone.utc)
+
+def _message_time() -> datetime:
+    global _last_message_time
+    with _message_clock_lock:
+        _last_message_time = max(datetime.now(timezone.utc), _last_message_time + timedelta(microseconds=1))
+        return _last_message_time
 
 def get_user_by_chat_id(db: Session, chat_id: uuid.UUID) -> Optional[User]:
-    return db.query(User).join(Chat).filter(Chat.chat_id == chat_id).first()
+    # A join lookup can't be answered from the identity map, so hits are remembered on the session itself.
+    # The cache lives and dies with the request's Session; the user can't change chats within one request.
+    users = db.info.setdefault("users_by_chat_id", {})
+    user = users.get(chat_id)
+    if user is None:
+        user = db.query(User).join(Chat).filter(Chat.chat_id == chat_id).first()
+        if user is not None:
+            users[chat_id] = user
+    return user
 
 def get_reflection_by_id(db: Session, reflection_id: uuid.UUID) -> Optional[Reflection]:
-    return db.query(Reflection).filter(Reflection.reflection_id == reflection_id).first()
+    # The orchestrator, the intent check and the flow handlers all look the reflection up in one request.
+    # Session.get answers from the session's identity map until a commit expires it, instead of a SELECT each time.
+    return db.get(Reflection, reflection_id)
 
 def get_latest_reflection_by_chat_id(db: Session, chat_id: uuid.UUID) -> Optional[Reflection]:
     return db.query(Reflection).filter(Reflection.chat_id == chat_id).order_by(Reflection.created_at.desc()).first()
@@ -23,18 +53,24 @@ def create_new_reflection(db: Session, chat_id: uuid.UUID) -> uuid.UUID:
     db.refresh(new_reflection)
     return new_reflection.reflection_id
 
+# Built once: update_reflection_stage runs on most turns; the values are bound per call and the SQL comes from the compiled cache
+_UPDATE_REFLECTION_STAGE = (
+    update(Reflection)
+    .where(Reflection.reflection_id == bindparam("rid"))
+    .values(current_stage=bindparam("stage"))
+    .execution_options(synchronize_session=False)
+)
+
 def update_reflection_stage(db: Session, reflection_id: uuid.UUID, next_stage: int):
     """FIXED: Add validation to prevent NULL stage updates"""
     if next_stage is None:
         # Log the error but don't update - keep current stage
-        import logging
         logging.error(f"Attempted to update reflection {reflection_id} with NULL stage")
         return
     
-    reflection = db.query(Reflection).filter(Reflection.reflection_id == reflection_id).first()
-    if reflection:
-        reflection.current_stage = next_stage
-        db.commit()
+    # One UPDATE instead of loading the reflection first; the commit right after expires any loaded copy
+    db.execute(_UPDATE_REFLECTION_STAGE, {"rid": reflection_id, "stage": next_stage})
+    db.commit()
 
 def save_message(db: Session, reflection_id: uuid.UUID, message: str, sender: int, stage_no: int, is_distress: bool = False):
     """FIXED: Add validation to prevent NULL stage_no in messages"""
@@ -43,44 +79,145 @@ def save_message(db: Session, reflection_id: uuid.UUID, message: str, sender: in
         reflection = get_reflection_by_id(db, reflection_id)
         stage_no = reflection.current_stage if reflection and reflection.current_stage is not None else 0
     
-    message_record = Message(reflection_id=reflection_id, message=message, sender=sender, current_stage=stage_no, is_distress=is_distress)
+    message_record = Message(reflection_id=reflection_id, message=message, sender=sender, current_stage=stage_no, is_distress=is_distress, created_at=_message_time())
     db.add(message_record)
     db.commit()
 
+def apply_stage_transition(
+    db: Session,
+    reflection_id: uuid.UUID,
+    new_stage: Optional[int] = None,
+    message: Optional[str] = None,
+    sender: int = 1,
+    stage_no: Optional[int] = None,
+    status: Optional[int] = None,
+    flow_type: Optional[str] = None,
+    summary: Optional[str] = None,
+    receiver_name: Optional[str] = None
+):
+    """
+    Update the reflection and save an optional message with a single commit,
+    instead of one commit per update_reflection_* / save_message call.
+    """
+    values = {}
+    if new_stage is not None:
+        values["current_stage"] = new_stage
+    if status is not None:
+        values["is_delivered"] = status
+    if flow_type is not None:
+        values["flow_type"] = flow_type
+    if summary is not None:
+        values["summary"] = summary
+    if receiver_name is not None:
+        values["receiver_name"] = receiver_name
+    if values:
+        db.execute(update(Reflection).where(Reflection.reflection_id == reflection_id).values(**values))
+    
+    if message is not None:
+        if stage_no is None:
+            stage_no = new_stage if new_stage is not None else 0
+        db.add(Message(reflection_id=reflection_id, message=message, sender=sender, current_stage=stage_no, is_distress=False, created_at=_message_time()))
+    db.commit()
+
+class MessageBuffer:
+    """
+    Collects the messages one request writes and inserts them with a single
+    multi-row INSERT and one commit.
+    """
+    def __init__(self, rows: Optional[list] = None):
+        self._rows = list(rows or [])
+
+    def add(self, reflection_id: uuid.UUID, message: str, sender: int, stage_no: int, is_distress: bool = False):
+        self._rows.append({
+            "reflection_id": reflection_id,
+            "message": message,
+            "sender": sender,
+            "current_stage": stage_no,
+            "is_distress": is_distress,
+            "created_at": _message_time()
+        })
+
+    def add_user_choice(self, reflection_id: uuid.UUID, choice_data: dict, stage_no: int):
+        readable_message = format_choice_as_message(choice_data)
+        if readable_message:
+            self.add(reflection_id, readable_message, sender=0, stage_no=stage_no)
+
+    def drain(self) -> list:
+        """Take the buffered rows, e.g. to hand them to the write-behind queue."""
+        rows, self._rows = self._rows, []
+        return rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def write(self, db: Session):
+        """Insert the buffered rows without committing, so they can share a commit with other writes."""
+        if not self._rows:
+            return
+        db.execute(insert(Message).values(self._rows))
+        self._rows = []
+
+    def flush(self, db: Session):
+        if not self._rows:
+            return
+        self.write(db)
+        db.commit()
+
 def get_last_user_message(db: Session, reflection_id: uuid.UUID) -> Optional[Message]:
     return db.query(Message).filter(Message.reflection_id == reflection_id, Message.sender == 0).order_by(Message.created_at.desc()).first()
 
 def get_all_messages(db: Session, reflection_id: uuid.UUID) -> list[Message]:
     return db.query(Message).filter(Message.reflection_id == reflection_id).order_by(Message.created_at.asc()).all()
 
+def get_conversation(db: Session, reflection_id: uuid.UUID) -> list:
+    """(sender, message) rows in order - only the two columns, without hydrating Message objects."""
+    return db.execute(
+        select(Message.sender, Message.message)
+        .where(Message.reflection_id == reflection_id)
+        .order_by(Message.created_at.asc())
+    ).all()
+
+def _update_reflection(db: Session, reflection_id: uuid.UUID, **values):
+    # Single-column writes: one UPDATE instead of loading the whole row to set an attribute on it
+    db.execute(update(Reflection).where(Reflection.reflection_id == reflection_id).values(**values))
+    db.commit()
+
 def update_reflection_status(db: Session, reflection_id: uuid.UUID, status: int):
-    reflection = db.query(Reflection).filter(Reflection.reflection_id == reflection_id).first()
-    if reflection:
-        reflection.is_delivered = status
-        db.commit()
+    _update_reflection(db, reflection_id, is_delivered=status)
 
 def update_reflection_flow_type(db: Session, reflection_id: uuid.UUID, flow_type: Optional[str]):
-    reflection = db.query(Reflection).filter(Reflection.reflection_id == reflection_id).first()
-    if reflection:
-        reflection.flow_type = flow_type
-        db.commit()
+    _update_reflection(db, reflection_id, flow_type=flow_type)
 
 def update_reflection_recipient(db: Session, reflection_id: uuid.UUID, name: str):
-    reflection = db.query(Reflection).filter(Reflection.reflection_id == reflection_id).first()
-    if reflection:
-        reflection.receiver_name = name
-        db.commit()
+    _update_reflection(db, reflection_id, receiver_name=name)
 
 def update_reflection_summary(db: Session, reflection_id: uuid.UUID, summary: str):
-    reflection = db.query(Reflection).filter(Reflection.reflection_id == reflection_id).first()
-    if reflection:
-        reflection.summary = summary
-        db.commit()
+    _update_reflection(db, reflection_id, summary=summary)
 
 def get_previous_stage(db: Session, reflection_id: uuid.UUID, steps: int) -> int:
     message = db.query(Message.current_stage).filter(Message.reflection_id == reflection_id).order_by(Message.created_at.desc()).offset(steps).first()
     return message.current_stage if message else 0
 
+def revert_to_previous_stage(db: Session, reflection_id: uuid.UUID, steps: int) -> int:
+    """
+    get_previous_stage + update_reflection_stage in one round-trip:
+    UPDATE ... SET current_stage = (stage of the message `steps` back) RETURNING current_stage
+    """
+    previous_stage = select(Message.current_stage).where(
+        Message.reflection_id == reflection_id
+    ).order_by(Message.created_at.desc()).offset(steps).limit(1).scalar_subquery()
+    
+    result = db.execute(
+        update(Reflection)
+        .where(Reflection.reflection_id == reflection_id)
+        .values(current_stage=func.coalesce(previous_stage, 0))
+        .returning(Reflection.current_stage)
+        .execution_options(synchronize_session=False)
+    )
+    stage = result.scalar_one_or_none()
+    db.commit()
+    return stage if stage is not None else 0
+
 
 def save_user_choice_message(db: Session, reflection_id: uuid.UUID, choice_data: dict, stage_no: int):
     """
@@ -102,7 +239,8 @@ def save_user_choice_message(db: Session, reflection_id: uuid.UUID, choice_data:
                 message=readable_message, 
                 sender=0,  # User message
                 current_stage=stage_no,
-                is_distress=False
+                is_distress=False,
+                created_at=_message_time()
             )
             db.add(message_record)
             db.commit()
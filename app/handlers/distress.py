@@ -6,27 +6,25 @@ from app.schemas import MessageRequest, MessageResponse
 from app.services import distress_service, llm_service, prompt_engine_service
 from app.handlers import database as db_handler
 from llm_system.persona import GOLDEN_PERSONA_PROMPT
-import uuid
-import json
 
 async def handle_distress_check(db: Session, request: MessageRequest) -> MessageResponse | None:
     level = await distress_service.check(message=request.message)
 
-    reflection_id = uuid.UUID(request.reflection_id)
-    reflection = db_handler.get_reflection_by_id(db, reflection_id)
+    reflection_id = request.reflection_id
+    reflection = await db_handler.run_sync(db_handler.get_reflection_by_id, db, reflection_id)
     current_stage = reflection.current_stage if reflection else 0
     if level == 1:
-        db_handler.update_reflection_status(db, reflection_id, 2)
+        await db_handler.run_sync(db_handler.update_reflection_status, db, reflection_id, 2)
         # Store user message
-        db_handler.save_message(db, reflection_id, request.message, sender=0, stage_no=current_stage, is_distress=True)
+        await db_handler.run_sync(db_handler.save_message, db, reflection_id, request.message, sender=0, stage_no=current_stage, is_distress=True)
 
         # Store system response at stage -1 as well
         distress_message = "For immediate support, please reach out to a crisis hotline."
-        db_handler.save_message(db, reflection_id, distress_message, sender=1, stage_no=-1)
+        await db_handler.run_sync(db_handler.save_message, db, reflection_id, distress_message, sender=1, stage_no=-1)
         
         return MessageResponse(
             success=False, 
-            reflection_id=request.reflection_id, 
+            reflection_id=str(reflection_id), 
             sarthi_message=distress_message, 
             data=[{"distress_level": "critical"}]
         )
@@ -35,24 +33,26 @@ async def handle_distress_check(db: Session, request: MessageRequest) -> Message
 
         # Store user message
         if request.message:
-            db_handler.save_message(db, reflection_id, request.message, sender=0, stage_no=current_stage, is_distress=True)
+            await db_handler.run_sync(db_handler.save_message, db, reflection_id, request.message, sender=0, stage_no=current_stage, is_distress=True)
 
         # FIXED: Use the correct method
-        prompt_response = await prompt_engine_service.process_dict_request({"stage_id": 22, "data": {}})
+        prompt_response = await prompt_engine_service.get_stage_prompt(22)
         prompt_text = prompt_response.get("prompt", "I understand you're going through a difficult time.")
         
-        llm_response_str = await llm_service.chat_completion(system_prompt=prompt_text, user_message=request.message, persona=GOLDEN_PERSONA_PROMPT)
-        try:
-            intensity = json.loads(llm_response_str).get("intensity", "neutral")
-            if intensity in ["high", "elevated"]:
-                # FIXED: Use the correct method
-                safety_response = await prompt_engine_service.process_dict_request({"stage_id": 23, "data": {}})
-                safety_prompt_text = safety_response.get("prompt", "Your wellbeing is important. Please consider reaching out for support.")
+        # Same request chat_completion builds, but kept as a dict instead of a JSON round-trip
+        llm_response = await llm_service.process_dict_request({
+            "reflection_id": None,
+            "prompt": f"{GOLDEN_PERSONA_PROMPT}\n\n{prompt_text}",
+            "user_message": request.message
+        })
+        intensity = llm_response.get("intensity", "neutral")
+        if intensity in ["high", "elevated"]:
+            # FIXED: Use the correct method
+            safety_response = await prompt_engine_service.get_stage_prompt(23)
+            safety_prompt_text = safety_response.get("prompt", "Your wellbeing is important. Please consider reaching out for support.")
 
-                db_handler.save_message(db, reflection_id, safety_prompt_text, sender=1, stage_no=current_stage)
-                
-                return MessageResponse(success=True, reflection_id=request.reflection_id, sarthi_message=safety_prompt_text)
-        except (json.JSONDecodeError, TypeError): 
-            pass
+            await db_handler.run_sync(db_handler.save_message, db, reflection_id, safety_prompt_text, sender=1, stage_no=current_stage)
+            
+            return MessageResponse(success=True, reflection_id=str(reflection_id), sarthi_message=safety_prompt_text)
     
     return None
\ No newline at end of file
@@ -1,223 +1,275 @@
-import json
+import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
+import random
+import re
 from sqlalchemy.orm import Session
 from app.schemas import MessageRequest, MessageResponse
 from app.services import global_intent_classifier, prompt_engine_service, llm_service
 from app.handlers import database as db_handler
+from app.handlers import message_queue
 from app.handlers.initial import update_database_with_system_message, process_and_respond
 from app.handlers import normal_flow
-from llm_system.persona import GOLDEN_PERSONA_PROMPT
+from typing import Tuple
 import uuid
 
 logger = logging.getLogger(__name__)
 
+# Options presented at stage 25 (venting stop) and stage 26 (global intent choices)
+_STAGE_25_CHOICES = (
+    {"choice": "1", "label": "I want to continue"},
+    {"choice": "0", "label": "I want to quit for now"}
+)
+_STAGE_26_CHOICES = (
+    {"choice": "1", "label": "Let's talk about this new feeling"},
+    {"choice": "2", "label": "Let's try a different approach"},
+    {"choice": "3", "label": "Can we go back?"}
+)
+_STAGE_25_LABELS = {option["choice"]: option["label"] for option in _STAGE_25_CHOICES}
+_STAGE_26_LABELS = {option["choice"]: option["label"] for option in _STAGE_26_CHOICES}
+
+# Venting messages that only acknowledge ("ok", "hmm", "go on"), and the replies that keep the user sharing.
+# Affirmatives like "yes" can answer the venting prompt's questions, so those still go to the LLM.
+_ACKNOWLEDGEMENT = re.compile(r"^(ok(ay)?|hm+|m+|go on|tell me more|\.{1,3})[.!]*$")
+_ACKNOWLEDGEMENT_REPLIES = (
+    "I'm here. Take your time.",
+    "I'm listening. Go on whenever you're ready.",
+    "Take all the time you need. I'm here with you."
+)
+
+# Classifier intents that offer the stage 26 choices (STOP_001 outside venting falls through to these)
+_STAGE_26_INTENTS = frozenset({"INTENT_RESTART", "INTENT_CONFUSED", "INTENT_STOP_001"})
+
+def _buffer_stage_choice(messages: db_handler.MessageBuffer, request: MessageRequest, stage: int, labels: dict):
+    """Queue the user's choice for a choice stage with its label and return the choice value."""
+    if not request.data:
+        return None
+    choice_data = request.data[0]
+    user_choice = choice_data.get("choice")
+    label = labels.get(user_choice)
+    # add_user_choice only reads the dict, so copy it only when there is a label to add
+    messages.add_user_choice(request.reflection_id, {**choice_data, "label": label} if label else choice_data, stage)
+    return user_choice
+
+
+async def _present_stage_choices(messages: db_handler.MessageBuffer, reflection_id: uuid.UUID, stage: int, choices: tuple, default_prompt: str, fallback_prompt: str) -> MessageResponse:
+    """If no choice is made, present the options for a choice stage. The prompt is queued for saving together with any buffered choice."""
+    logger.info("No choice provided for Stage %s. Presenting options.", stage)
+    try:
+        prompt_response = await prompt_engine_service.get_stage_prompt(stage)
+        prompt_text = prompt_response.get("prompt", default_prompt)
+    except Exception as e:
+        logger.error("Failed to get prompt for stage %s: %s", stage, e)
+        prompt_text = fallback_prompt
+    messages.add(reflection_id, prompt_text, sender=1, stage_no=stage)
+    message_queue.enqueue_buffer(messages)
+    # Every field here is server-generated, so skip validation. The option dicts are
+    # shared module constants; serialization only reads them, so no per-response copies.
+    return MessageResponse.model_construct(
+        success=True,
+        reflection_id=str(reflection_id),
+        sarthi_message=prompt_text,
+        current_stage=stage, next_stage=stage,
+        data=list(choices)
+    )
+
+
+async def _quit_venting(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse:
+    """Stage 25, choice 0: "I want to quit for now" """
+    reflection_id = request.reflection_id
+    logger.info("User chose to quit - closing venting session")
+    final_message = "Thank you for sharing with me today. Take care, and feel free to start a new conversation whenever you're ready."
+    await db_handler.run_sync(db_handler.apply_stage_transition, db, reflection_id, message=final_message, sender=1, stage_no=25, status=3)
+    return MessageResponse(
+        success=True,
+        reflection_id=str(reflection_id),
+        sarthi_message=final_message,
+        current_stage=None, next_stage=None, data=[{"session_closed": True}]
+    )
+
+
+async def _continue_venting(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse:
+    """Stage 25, choice 1: "I want to continue" """
+    # Choice "1" is forwarded unchanged, so stage 26 would always resolve it to "new feeling" -
+    # go straight there instead of writing stage 26 and saving the choice a second time
+    logger.info("User chose to continue - back to venting sanctuary")
+    return await _talk_about_new_feeling(db, request, chat_id)
+
+
+async def _talk_about_new_feeling(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse:
+    """Stage 26, choice 1"""
+    logger.info("Choice 1: New feeling - transitioning to venting sanctuary")
+    await db_handler.run_sync(db_handler.apply_stage_transition, db, request.reflection_id, new_stage=24, flow_type="venting")
+    return await handle_venting_sanctuary(db, request, chat_id)
+
+
+async def _try_different_approach(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse:
+    """Stage 26, choice 2"""
+    reflection_id = request.reflection_id
+    logger.info("Choice 2: Different approach - restarting flow at stage 1")
+    await db_handler.run_sync(db_handler.update_reflection_stage, db, reflection_id, 1)
+    return await process_and_respond(db, 1, reflection_id, chat_id, request)
+
+
+async def _go_back(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse:
+    """Stage 26, choice 3"""
+    reflection_id = request.reflection_id
+    logger.info("Choice 3: Go back to the previous stage")
+    previous_stage = await db_handler.run_sync(db_handler.revert_to_previous_stage, db, reflection_id, steps=2)
+    return await process_and_respond(db, previous_stage, reflection_id, chat_id, request)
+
+
+_STAGE_25_HANDLERS = {"0": _quit_venting, "1": _continue_venting}
+_STAGE_26_HANDLERS = {"1": _talk_about_new_feeling, "2": _try_different_approach, "3": _go_back}
+
+
 async def _handle_stage_25(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse:
     """Helper function to handle all logic for Stage 25 (Venting Stop/Continue)."""
-    reflection_id = uuid.UUID(request.reflection_id)
-    user_choice = request.data[0].get("choice") if request.data else None
-    logger.info(f"Handling Stage 25 logic with user_choice: {user_choice}")
-
     # Store user choice with appropriate labels
-    if request.data and len(request.data) > 0:
-        choice_data = request.data[0].copy()
-        if choice_data.get("choice") == "0":
-            choice_data["label"] = "I want to quit for now"
-        elif choice_data.get("choice") == "1":
-            choice_data["label"] = "I want to continue"
-        db_handler.save_user_choice_message(db, reflection_id, choice_data, 25)
+    messages = db_handler.MessageBuffer()
+    user_choice = _buffer_stage_choice(messages, request, 25, _STAGE_25_LABELS)
+    logger.info("Handling Stage 25 logic with user_choice: %s", user_choice)
 
     # Process the user's choice
-    if user_choice == "0":  # "I want to quit for now"
-        logger.info("User chose to quit - closing venting session")
-        db_handler.update_reflection_status(db, reflection_id, 3)
-        final_message = "Thank you for sharing with me today. Take care, and feel free to start a new conversation whenever you're ready."
-        db_handler.save_message(db, reflection_id, final_message, sender=1, stage_no=25)
-        return MessageResponse(
-            success=True,
-            reflection_id=str(reflection_id),
-            sarthi_message=final_message,
-            current_stage=None, next_stage=None, data=[{"session_closed": True}]
-        )
-
-    elif user_choice == "1":  # "I want to continue"
-        logger.info("User chose to continue - moving to stage 26")
-        db_handler.update_reflection_stage(db, reflection_id, 26)
-        return await _handle_stage_26(db, request, chat_id)
-
-    else:
-        # If no choice is made, present the options for stage 25
-        logger.info("No choice provided for Stage 25. Presenting options.")
-        try:
-            prompt_response = await prompt_engine_service.process_dict_request({"stage_id": 25, "data": {}})
-            prompt_text = prompt_response.get("prompt", "Would you like to continue or take a break?")
-        except Exception as e:
-            logger.error(f"Failed to get prompt for stage 25: {e}")
-            prompt_text = "I hear you'd like to pause. Would you like to continue exploring or take a break for now?"
-        db_handler.save_message(db, reflection_id, prompt_text, sender=1, stage_no=25)
-        return MessageResponse(
-            success=True,
-            reflection_id=str(reflection_id),
-            sarthi_message=prompt_text,
-            current_stage=25, next_stage=25,
-            data=[
-                {"choice": "1", "label": "I want to continue"},
-                {"choice": "0", "label": "I want to quit for now"}
-            ]
-        )
+    handler = _STAGE_25_HANDLERS.get(user_choice)
+    if handler:
+        await db_handler.run_sync(messages.flush, db)
+        return await handler(db, request, chat_id)
+    return await _present_stage_choices(
+        messages, request.reflection_id, 25, _STAGE_25_CHOICES,
+        default_prompt="Would you like to continue or take a break?",
+        fallback_prompt="I hear you'd like to pause. Would you like to continue exploring or take a break for now?"
+    )
 
 
 async def _handle_stage_26(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse:
     """Helper function to handle all logic for Stage 26 (Global Intent Choices)."""
-    reflection_id = uuid.UUID(request.reflection_id)
-    user_choice = request.data[0].get("choice") if request.data else None
-    logger.info(f"Handling Stage 26 logic with user_choice: {user_choice}")
-
     # Store user choice with appropriate labels
-    if request.data and len(request.data) > 0:
-        choice_data = request.data[0].copy()
-        if choice_data.get("choice") == "1":
-            choice_data["label"] = "Let's talk about this new feeling"
-        elif choice_data.get("choice") == "2":
-            choice_data["label"] = "Let's try a different approach"
-        elif choice_data.get("choice") == "3":
-            choice_data["label"] = "Can we go back?"
-        db_handler.save_user_choice_message(db, reflection_id, choice_data, 26)
+    messages = db_handler.MessageBuffer()
+    user_choice = _buffer_stage_choice(messages, request, 26, _STAGE_26_LABELS)
+    logger.info("Handling Stage 26 logic with user_choice: %s", user_choice)
 
     # Process the user's choice
-    if user_choice == "1":
-        logger.info("Choice 1: New feeling - transitioning to venting sanctuary")
-        db_handler.update_reflection_flow_type(db, reflection_id, "venting")
-        db_handler.update_reflection_stage(db, reflection_id, 24)
-        return await handle_venting_sanctuary(db, request, chat_id)
-    elif user_choice == "2":
-        logger.info("Choice 2: Different approach - restarting flow at stage 1")
-        db_handler.update_reflection_stage(db, reflection_id, 1)
-        return await process_and_respond(db, 1, reflection_id, chat_id, request)
-    elif user_choice == "3":
-        logger.info("Choice 3: Go back to the previous stage")
-        previous_stage = db_handler.get_previous_stage(db, reflection_id, steps=2)
-        db_handler.update_reflection_stage(db, reflection_id, previous_stage)
-        return await process_and_respond(db, previous_stage, reflection_id, chat_id, request)
-    else:
-        # If no choice is made, present the options
-        logger.info("No choice provided for Stage 26. Presenting options.")
-        try:
-            prompt_response = await prompt_engine_service.process_dict_request({"stage_id": 26, "data": {}})
-            prompt_text = prompt_response.get("prompt", "How would you like to proceed?")
-        except Exception as e:
-            logger.error(f"Failed to get prompt for stage 26: {e}")
-            prompt_text = "It seems like you want to change direction. How would you like to proceed?"
-        db_handler.save_message(db, reflection_id, prompt_text, sender=1, stage_no=26)
-        return MessageResponse(
-            success=True, reflection_id=str(reflection_id), 
-            sarthi_message=prompt_text,
-            current_stage=26, 
-            next_stage=26,
-            data=[
-                {"choice": "1", "label": "Let's talk about this new feeling"},
-                {"choice": "2", "label": "Let's try a different approach"},
-                {"choice": "3", "label": "Can we go back?"}
-            ]
-        )
-
-async def handle_venting_sanctuary(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse:
-    """
-    Handle venting sanctuary (stage 24) with system_response processing
-    Now checks for intent transitions and automatically moves to normal flow
-    """
-    reflection_id = uuid.UUID(request.reflection_id)
-    current_stage = 24
-
-    logger.info(f" Entering venting sanctuary for reflection {reflection_id}")
+    handler = _STAGE_26_HANDLERS.get(user_choice)
+    if handler:
+        await db_handler.run_sync(messages.flush, db)
+        return await handler(db, request, chat_id)
+    return await _present_stage_choices(
+        messages, request.reflection_id, 26, _STAGE_26_CHOICES,
+        default_prompt="How would you like to proceed?",
+        fallback_prompt="It seems like you want to change direction. How would you like to proceed?"
+    )
 
-    # Store user text message first (if any)
-    # if request.message and request.message.strip():
-    #     db_handler.save_message(db, reflection_id, request.message, sender=0, stage_no=current_stage)
-    #     logger.info(f" Stored venting message: {request.message}")
-    
-    # Store choice data (if any) - though venting usually doesn't have structured choices
+def _save_venting_choice(db: Session, request: MessageRequest, reflection_id: uuid.UUID, current_stage: int):
+    """Store choice data (if any) - though venting usually doesn't have structured choices"""
     if request.data and len(request.data) > 0:
         choice_data = request.data[0]
         # Only store if it's a meaningful choice (not delivery-related)
         if not any(key in choice_data for key in ["delivery_mode", "reveal_name", "recipient_email", "recipient_phone"]):
             db_handler.save_user_choice_message(db, reflection_id, choice_data, current_stage)
-            logger.info(f" Stored venting choice: {choice_data}")
-    
-    
-    # Get venting prompt from prompt engine
+            logger.debug("Stored venting choice: %s", choice_data)
+
+
+async def _get_venting_prompt(current_stage: int) -> str:
+    """Get venting prompt from prompt engine"""
     try:
-        prompt_response = await prompt_engine_service.process_dict_request({"stage_id": current_stage, "data": {}})
-        prompt_text = prompt_response.get("prompt", "I'm listening.")
-        logger.info(f" Retrieved venting prompt for stage {current_stage}")
+        prompt_response = await prompt_engine_service.get_stage_prompt(current_stage)
+        logger.debug("Retrieved venting prompt for stage %s", current_stage)
+        return prompt_response.get("prompt", "I'm listening.")
     except Exception as e:
-        logger.error(f"Failed to get venting prompt: {e}")
-        prompt_text = "I'm here to listen. Please share what's on your mind."
+        logger.error("Failed to get venting prompt: %s", e)
+        return "I'm here to listen. Please share what's on your mind."
+
+
+async def _venting_reply(db: Session, request: MessageRequest, reflection_id_str: str, current_stage: int) -> Tuple[str, dict]:
+    """Sarthi's venting reply and the system_response the LLM extracted from the message."""
+    reflection_id = request.reflection_id
+    # The choice save is the only use of the SQLAlchemy session here, so it can run while the prompt is
+    # fetched and the LLM answers. Plain venting turns carry no data and skip the worker thread entirely.
+    choice_save = asyncio.create_task(
+        db_handler.run_sync(_save_venting_choice, db, request, reflection_id, current_stage)
+    ) if request.data else None
+    prompt_text = await _get_venting_prompt(current_stage)
     
     # Call LLM service to get both user_response and system_response
     try:
         llm_request = {
             "prompt": prompt_text,
             "user_message": request.message,
-            "reflection_id": str(reflection_id)
+            "reflection_id": reflection_id_str,
+            "prompt_cache_key": reflection_id_str
         }
         
-        logger.info(f"🤖 Calling LLM service for venting analysis")
-        llm_response_str = await llm_service.process_json_request(json.dumps(llm_request))
-        llm_response = json.loads(llm_response_str)
+        llm_response = await llm_service.process_dict_request(llm_request)
         
         user_response = llm_response.get("user_response", {})
         system_response = llm_response.get("system_response", {})
         
         sarthi_response_msg = user_response.get("message", "I'm listening.")
         
-        logger.info(f" LLM Response received - User: '{sarthi_response_msg[:50]}...', System: {system_response}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("LLM Response received - User: '%s...', System: %s", sarthi_response_msg[:50], system_response)
         
     except Exception as e:
-        logger.error(f"Venting LLM error: {e}")
+        logger.error("Venting LLM error: %s", e)
         sarthi_response_msg = "I'm listening. Please continue."
         system_response = {}
 
+    # The caller writes through the same session next
+    if choice_save:
+        await choice_save
+    return sarthi_response_msg, system_response
+
+
+async def handle_venting_sanctuary(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse:
+    """
+    Handle venting sanctuary (stage 24) with system_response processing
+    Now checks for intent transitions and automatically moves to normal flow
+    """
+    reflection_id = request.reflection_id
+    reflection_id_str = str(reflection_id)
+    current_stage = 24
+
+    # Bare acknowledgements carry no new content or intent, so answer them without the LLM
+    acknowledgement = not request.data and bool(_ACKNOWLEDGEMENT.match((request.message or "").strip().lower()))
+    if acknowledgement:
+        sarthi_response_msg = random.choice(_ACKNOWLEDGEMENT_REPLIES)
+        system_response = {}
+    else:
+        sarthi_response_msg, system_response = await _venting_reply(db, request, reflection_id_str, current_stage)
+
+    # One INFO line per turn, logged where the turn ends
+    intent = ""
+    
     #  NEW LOGIC: Process system_response and check for intent transition
     if system_response:
-        logger.info(f" Processing system_response: {system_response}")
-        
-        # Update database with system_response data
-        await update_database_with_system_message(db, system_response, reflection_id)
-        logger.info(f" Database updated with system_response")
+        logger.debug("Processing system_response: %s", system_response)
         
         # Check if intent is not 'venting' and not null/empty
-        intent = system_response.get("intent")
-        logger.info(f" Detected intent: {intent}")
-        
-        if (intent is not None and 
-            isinstance(intent, str) and 
-            intent.strip() and 
-            intent.strip().lower() != "venting"):
-            logger.info(f" Intent transition detected! Moving from venting to normal flow")
-            logger.info(f"   - Intent: {intent}")
-            logger.info(f"   - Will redirect to stage 2 (AWAITING_EMOTION)")
+        raw_intent = system_response.get("intent")
+        intent = raw_intent.strip().lower() if isinstance(raw_intent, str) else ""
+        if intent and intent != "venting":
+            logger.info("Venting turn for reflection %s: intent=%s, moving to stage 2 (AWAITING_EMOTION)", reflection_id, intent)
             
-            # Update reflection stage to 2 (AWAITING_EMOTION)
-            db_handler.update_reflection_stage(db, reflection_id, 2)
-            logger.info(f" Updated reflection stage from {current_stage} to 2")
+            # Store the system_response data and move to stage 2 (AWAITING_EMOTION) in one commit
+            await update_database_with_system_message(db, system_response, reflection_id, next_stage=2)
 
             # OPTIMIZED: Directly call normal flow instead of manual prompt handling
             return await normal_flow.handle_normal_flow(db, request, chat_id)
             
         else:
-            logger.info(f" Staying in venting sanctuary - intent is '{intent}' (continuing venting)")
+            logger.debug("Staying in venting sanctuary - intent is '%s' (continuing venting)", intent)
+            await update_database_with_system_message(db, system_response, reflection_id)
     else:
-        logger.info(f" No system_response received - continuing normal venting flow")
+        logger.debug("No system_response received - continuing normal venting flow")
 
     #  NORMAL VENTING FLOW: Continue if no intent transition
-    # Save normal Sarthi response for continued venting
-    db_handler.save_message(db, reflection_id, sarthi_response_msg, sender=1, stage_no=current_stage)
+    # Save normal Sarthi response for continued venting - nothing in this turn reads it back
+    message_queue.enqueue_message(reflection_id, sarthi_response_msg, sender=1, stage_no=current_stage)
     
-    logger.info(f" Continuing venting sanctuary - user actively sharing")
+    logger.info("Venting turn for reflection %s: intent=%s, acknowledgement=%s", reflection_id, intent, acknowledgement)
     return MessageResponse(
         success=True, 
-        reflection_id=str(reflection_id), 
+        reflection_id=reflection_id_str, 
         sarthi_message=sarthi_response_msg, 
         current_stage=current_stage, 
         next_stage=current_stage,
@@ -225,21 +277,59 @@ async def handle_venting_sanctuary(db: Session, request: MessageRequest, chat_id
     )
 
 
+def _classify(request: MessageRequest):
+    """Global intent classifier call for this message."""
+    return global_intent_classifier.classify_intent(
+        reflection_id=str(request.reflection_id),
+        user_message=request.message
+    )
+
+
+def _has_text(request: MessageRequest) -> bool:
+    return bool(request.message and request.message.strip())
+
+
+def _likely_classified(request: MessageRequest) -> bool:
+    """Free text without a choice. Choice turns mostly answer the stage 25/26 options, where the classification is never used."""
+    return _has_text(request) and not (request.data and request.data[0].get("choice") is not None)
+
+
+def prefetch_classification(request: MessageRequest, current_stage: int) -> asyncio.Task | None:
+    """
+    Start classifying the message ahead of handle_global_intent_check, e.g. while the distress check runs.
+    The classifier shares in-flight calls, so the check picks up this result instead of calling the LLM again.
+    """
+    if current_stage in (25, 26, 27) or not _likely_classified(request):
+        return None
+    task = asyncio.create_task(_classify(request))
+    # The check consumes the result; don't warn about an exception nobody retrieved from this task
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return task
+
+
 async def handle_global_intent_check(db: Session, request: MessageRequest, chat_id: uuid.UUID) -> MessageResponse | None:
     """
     Handle global intent classification and choices - UPDATED with INTENT_STOP_001
     """
+    reflection_id = request.reflection_id
+    has_text = _has_text(request)
+    
+    # Classification does not depend on the reflection, so start it while the reflection loads
+    classification = asyncio.create_task(_classify(request)) if _likely_classified(request) else None
+    
     # Get current reflection to check stage
-    reflection_id = uuid.UUID(request.reflection_id)
-    reflection = db_handler.get_reflection_by_id(db, reflection_id)
+    reflection = await db_handler.run_sync(db_handler.get_reflection_by_id, db, reflection_id)
     current_stage = reflection.current_stage if reflection else 0
     flow_type = reflection.flow_type if reflection else None
     
-    logger.info(f"Global intent check - current_stage: {current_stage}")
+    logger.info("Global intent check - current_stage: %s", current_stage)
     
     # ===== HANDLE VENTING STOP CHOICES (Stage 25) =====
     #    if current_stage == 25 and flow_type == "venting":
 
+    if current_stage in (25, 26) and classification:
+        classification.cancel()
+    
     if current_stage == 25:
         return await _handle_stage_25(db, request, chat_id)
     
@@ -248,18 +338,20 @@ async def handle_global_intent_check(db: Session, request: MessageRequest, chat_
         return await _handle_stage_26(db, request, chat_id)
     # If not in stages 25 or 26, proceed to classify global intent
     
+    # Only free text carries an intent - an empty message goes straight to the flow
+    if not has_text:
+        return None
+    
     # ===== RUN GLOBAL INTENT CLASSIFICATION =====
     try:
-        intent_result = await global_intent_classifier.classify_intent(
-            reflection_id=request.reflection_id,
-            user_message=request.message
-        )
+        # Await the call directly when it wasn't started early; a task would only add a loop iteration
+        intent_result = await (classification if classification else _classify(request))
         
         global_intent = intent_result.system_response.get("intent")
-        logger.info(f"Global intent detected: {global_intent}")
+        logger.info("Global intent detected: %s", global_intent)
         
     except Exception as e:
-        logger.error(f"Global intent classification failed: {e}")
+        logger.error("Global intent classification failed: %s", e)
         return None  # Let normal flow handle it
     
     # ===== HANDLE VENTING STOP INTENT (INTENT_STOP_001) =====
@@ -267,24 +359,24 @@ async def handle_global_intent_check(db: Session, request: MessageRequest, chat_
         logger.info("Detected INTENT_STOP_001 (venting stop) - moving to stage 25")
         
         # Update to stage 25 (venting stop stage)
-        db_handler.update_reflection_stage(db, reflection_id, 25)
+        await db_handler.run_sync(db_handler.update_reflection_stage, db, reflection_id, 25)
         
         return await _handle_stage_25(db, request, chat_id)
 
     
     # ===== HANDLE RESTART/CONFUSED INTENTS =====
-    if global_intent in ["INTENT_RESTART", "INTENT_CONFUSED","INTENT_STOP_001"]:
-        logger.info(f"Detected {global_intent} - moving to stage 26")
+    if global_intent in _STAGE_26_INTENTS:
+        logger.info("Detected %s - moving to stage 26", global_intent)
         
         # Update to stage 26 (global intent choice stage)
-        db_handler.update_reflection_stage(db, reflection_id, 26)
+        await db_handler.run_sync(db_handler.update_reflection_stage, db, reflection_id, 26)
         
         return await _handle_stage_26(db, request, chat_id)
     
     # ===== HANDLE SKIP TO DRAFT =====
     if global_intent == "INTENT_SKIP_TO_DRAFT":
         logger.info("Skip to draft intent - going to stage 16")
-        db_handler.update_reflection_stage(db, reflection_id, 16)
+        await db_handler.run_sync(db_handler.update_reflection_stage, db, reflection_id, 16)
         return await normal_flow.handle_normal_flow(db, request, chat_id)  # Let normal flow handle stage 16
         
     # No global intent detected - let normal flow continue
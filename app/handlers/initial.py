@@ -1,62 +1,92 @@
 # =======================================================================
 # app/handlers/initial.py (Complete Proper Logic Implementation)
 # =======================================================================
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from app.schemas import MessageRequest, MessageResponse
+from app.models import Reflection
 from app.handlers import database as db_handler
 from app.services import prompt_engine_service, llm_service
 from llm_system.persona import GOLDEN_PERSONA_PROMPT
-from typing import Union, Tuple, Dict
+from typing import Union, Tuple, Dict, Optional
 from app.handlers.database import save_user_choice_message
+import asyncio
 import uuid
-import json
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def find_data(stage_no: int, db: Session, reflection_id: uuid.UUID, chat_id: uuid.UUID) -> dict:
+def _user_name(db: Session, reflection: Reflection, chat_id: uuid.UUID) -> dict:
+    user = db_handler.get_user_by_chat_id(db, chat_id)
+    return {"user_name": user.name if user else "there"}
+
+def _user_emotions(db: Session, reflection: Reflection, chat_id: uuid.UUID) -> dict:
+    return {"user_emotions": reflection.emotion or "the way you're feeling"}
+
+def _conversation_context(db: Session, reflection: Reflection, chat_id: uuid.UUID) -> dict:
+    rows = db_handler.get_conversation(db, reflection.reflection_id)
+    context = "\n".join([("User: " if sender == 0 else "Sarthi: ") + message for sender, message in rows])
+    return {"full_conversation_context": context}
+
+def _recipient_name(db: Session, reflection: Reflection, chat_id: uuid.UUID) -> dict:
+    logger.debug("find_data: reflection.receiver_name = '%s'", reflection.receiver_name)
+    return {"recipient_name": reflection.receiver_name or "them"}
+
+def _venting_emotions(db: Session, reflection: Reflection, chat_id: uuid.UUID) -> dict:
+    return {"emotions": reflection.emotion or "this feeling"}
+
+# Template data for each dynamic stage
+_STAGE_DATA = {
+    0: _user_name,
+    3: _user_emotions,
+    16: _conversation_context,
+    18: _recipient_name,
+    19: _recipient_name,
+    24: _venting_emotions
+}
+
+def _load_stage_data(fetch, db: Session, reflection_id: uuid.UUID, chat_id: uuid.UUID) -> dict:
     reflection = db_handler.get_reflection_by_id(db, reflection_id)
     if not reflection: return {}
+    return fetch(db, reflection, chat_id)
 
-    if stage_no == 0:
-        user = db_handler.get_user_by_chat_id(db, chat_id)
-        return {"user_name": user.name if user else "there"}
-    elif stage_no == 3:
-        return {"user_emotions": reflection.emotion or "the way you're feeling"}
-    elif stage_no == 16:
-        messages = db_handler.get_all_messages(db, reflection_id)
-        context = "\n".join([f"{'User' if msg.sender == 0 else 'Sarthi'}: {msg.message}" for msg in messages])
-        return {"full_conversation_context": context}
-    elif stage_no in [18, 19]:
-        print(f"DEBUG find_data: reflection.receiver_name = '{reflection.receiver_name}'")
-        return {"recipient_name": reflection.receiver_name or "them"}
-    elif stage_no == 24:
-        return {"emotions": reflection.emotion or "this feeling"}
-    return {}
+async def find_data(stage_no: int, db: Session, reflection_id: uuid.UUID, chat_id: uuid.UUID) -> dict:
+    fetch = _STAGE_DATA.get(stage_no)
+    if not fetch:
+        return {}
+    # The reflection lookup and the stage's own reads run together in one worker thread
+    return await db_handler.run_sync(_load_stage_data, fetch, db, reflection_id, chat_id)
 
-async def update_database_with_system_message(db: Session, system_response: dict, reflection_id: uuid.UUID):
-    """Updated to use system_response instead of system_message for consistency"""
-    reflection = db_handler.get_reflection_by_id(db, reflection_id)
-    if not reflection: return
+async def update_database_with_system_message(db: Session, system_response: dict, reflection_id: uuid.UUID, next_stage: Optional[int] = None, messages: Optional[db_handler.MessageBuffer] = None):
+    """
+    Updated to use system_response instead of system_message for consistency.
+    A next_stage moves the reflection there, and buffered messages are inserted, in the same commit.
+    """
+    await db_handler.run_sync(_apply_system_response, db, system_response, reflection_id, next_stage, messages)
 
-    logger.info(f"Updating database with system_response: {system_response}")
+# system_response keys and the reflection columns they fill
+_SYSTEM_RESPONSE_FIELDS = (
+    ("recipient_name", "receiver_name"),
+    ("relationship", "receiver_relationship"),
+    ("emotions", "emotion"),
+    ("intent", "flow_type")
+)
 
-    if recipient_name := system_response.get("recipient_name"):
-        reflection.receiver_name = recipient_name
-        logger.info(f"Set recipient_name to: {recipient_name}")
-    
-    if relationship := system_response.get("relationship"):
-        reflection.receiver_relationship = relationship
-        logger.info(f"Set relationship to: {relationship}")
-    
-    if emotions := system_response.get("emotions"):
-        reflection.emotion = emotions
-        logger.info(f"Set emotions to: {emotions}")
-    
-    if intent := system_response.get("intent"):
-        reflection.flow_type = intent
-        logger.info(f"Set flow_type to: {intent} (from stage {reflection.current_stage})")
-    
+def _apply_system_response(db: Session, system_response: dict, reflection_id: uuid.UUID, next_stage: Optional[int] = None, messages: Optional[db_handler.MessageBuffer] = None):
+    logger.debug("Updating database with system_response: %s", system_response)
+
+    # Only the fields the LLM returned, written with one UPDATE instead of loading the reflection first
+    values = {column: system_response[key] for key, column in _SYSTEM_RESPONSE_FIELDS if system_response.get(key)}
+    if next_stage is not None:
+        values["current_stage"] = next_stage
+    if not values and not messages:
+        return
+
+    if values:
+        db.execute(update(Reflection).where(Reflection.reflection_id == reflection_id).values(**values))
+        logger.info("Set reflection fields: %s", values)
+    if messages:
+        messages.write(db)
     db.commit()
 
 class LLMProcessingError(Exception):
@@ -64,11 +94,15 @@ class LLMProcessingError(Exception):
     pass
 
 async def _base_process_and_respond(db: Session, current_stage: int, reflection_id: uuid.UUID, chat_id: uuid.UUID, request: MessageRequest = None) -> Tuple[str, dict]:
-    logger.info(f"Processing stage {current_stage} for reflection {reflection_id}")
+    sarthi_message, system_response, _ = await _run_stage(db, current_stage, reflection_id, chat_id, request)
+    return sarthi_message, system_response
+
+async def _run_stage(db: Session, current_stage: int, reflection_id: uuid.UUID, chat_id: uuid.UUID, request: MessageRequest = None) -> Tuple[str, dict, int]:
+    """Process a stage; also returns the stage the reflection is left at."""
+    logger.info("Processing stage %s for reflection %s", current_stage, reflection_id)
     
     # Step 1: Get prompt configuration from prompt engine
-    prompt_request_data = {"stage_id": current_stage, "data": {}}
-    prompt_result = await prompt_engine_service.process_dict_request(prompt_request_data)
+    prompt_result = await prompt_engine_service.get_stage_prompt(current_stage)
     
     # Extract configuration
     prompt_template = prompt_result['prompt']
@@ -76,70 +110,78 @@ async def _base_process_and_respond(db: Session, current_stage: int, reflection_
     is_static = prompt_result['is_static']
     prompt_type = prompt_result['prompt_type']
     
-    logger.info(f"Prompt config - type: {prompt_type}, static: {is_static}, next_stage: {next_stage}")
+    logger.info("Prompt config - type: %s, static: %s, next_stage: %s", prompt_type, is_static, next_stage)
     
     final_sarthi_message = ""
     system_response = {}
     
     # Step 2: Process based on prompt_type and is_static conditions
     if prompt_type == 0:  # USER PROMPT
-        logger.info("Processing USER PROMPT (prompt_type=0)")
+        logger.debug("Processing USER PROMPT (prompt_type=0)")
         
         if is_static == 0:  # DYNAMIC USER PROMPT
-            logger.info("Dynamic user prompt - calling find_data() and template processing")
+            logger.debug("Dynamic user prompt - calling find_data() and template processing")
             
             # Get dynamic data for this stage
             data_dict = await find_data(current_stage, db, reflection_id, chat_id)
-            logger.info(f"Data for stage {current_stage}: {data_dict}")
+            logger.debug("Data for stage %s: %s", current_stage, data_dict)
             
             # Process template with dynamic data using prompt engine
-            template_request_data = {"stage_id": current_stage, "data": data_dict}
-            final_prompt_result = await prompt_engine_service.process_dict_request(template_request_data)
+            final_prompt_result = await prompt_engine_service.render_stage_prompt(current_stage, data_dict)
             final_sarthi_message = final_prompt_result['prompt']
             
-            logger.info(f"Final dynamic user prompt: {final_sarthi_message}")
+            logger.debug("Final dynamic user prompt: %s", final_sarthi_message)
             
         else:  # STATIC USER PROMPT (is_static == 1)
-            logger.info("Static user prompt - using prompt as-is")
+            logger.debug("Static user prompt - using prompt as-is")
             final_sarthi_message = prompt_template
             
     else:  # SYSTEM PROMPT (prompt_type == 1)
-        logger.info("Processing SYSTEM PROMPT (prompt_type=1)")
+        logger.debug("Processing SYSTEM PROMPT (prompt_type=1)")
         
         # Get current user message from request for LLM processing
         user_message = request.message if request and request.message else ""
-        logger.info(f"Current user message for LLM: '{user_message}'")
+        logger.debug("Current user message for LLM: '%s'", user_message)
         
         if is_static == 0:  # DYNAMIC SYSTEM PROMPT
-            logger.info("Dynamic system prompt - calling find_data() and template processing")
+            logger.debug("Dynamic system prompt - calling find_data() and template processing")
             
             # Get dynamic data for this stage
             data_dict = await find_data(current_stage, db, reflection_id, chat_id)
-            logger.info(f"Data for stage {current_stage}: {data_dict}")
+            logger.debug("Data for stage %s: %s", current_stage, data_dict)
             
             # Process template with dynamic data using prompt engine
-            template_request_data = {"stage_id": current_stage, "data": data_dict}
-            final_prompt_result = await prompt_engine_service.process_dict_request(template_request_data)
+            final_prompt_result = await prompt_engine_service.render_stage_prompt(current_stage, data_dict)
             final_system_prompt = final_prompt_result['prompt']
             
-            logger.info(f"Final dynamic system prompt length: {len(final_system_prompt)}")
+            logger.debug("Final dynamic system prompt length: %s", len(final_system_prompt))
             
         else:  # STATIC SYSTEM PROMPT (is_static == 1)
-            logger.info("Static system prompt - using prompt as-is")
+            logger.debug("Static system prompt - using prompt as-is")
             final_system_prompt = prompt_template
         
+        # The user's message is known before the LLM answers, so it is saved while the request is in flight
+        user_save = asyncio.create_task(
+            db_handler.run_sync(db_handler.save_message, db, reflection_id, user_message, 0, current_stage)
+        ) if user_message else None
+
         # Call LLM service with system prompt and user message
         try:
-            logger.info(f"Calling LLM service with system prompt and user message")
+            logger.debug("Calling LLM service with system prompt and user message")
             
-            llm_response_str = await llm_service.process_json_request(json.dumps({
-                "prompt": final_system_prompt,
-                "user_message": user_message,
-                "reflection_id": str(reflection_id)
-            }))
-            
-            llm_response = json.loads(llm_response_str)
-            logger.info(f"LLM response received: {llm_response_str}")
+            try:
+                llm_response = await llm_service.process_stage_request({
+                    "prompt": final_system_prompt,
+                    "user_message": user_message,
+                    "reflection_id": str(reflection_id)
+                })
+            finally:
+                # Everything after this writes through the same session, which is not thread-safe
+                if user_save:
+                    await user_save
+            # The raw response can be several KB of JSON, so it is only rendered at DEBUG
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("LLM response received: %s", llm_response)
             
             # Extract user_response and system_response
             user_response = llm_response.get("user_response", {})
@@ -150,71 +192,72 @@ async def _base_process_and_respond(db: Session, current_stage: int, reflection_
                 user_message_text = user_response.get("message", "").strip()
                 if user_message_text:
                     final_sarthi_message = user_message_text
-                    logger.info(f"Extracted user message: '{final_sarthi_message}'")
+                    logger.debug("Extracted user message: '%s'", final_sarthi_message)
                 else:
                     logger.warning("User response message is empty")
                     final_sarthi_message = "I'm processing your message."
             else:
-                logger.info("No user_response in LLM response - this is okay for some system prompts")
+                logger.debug("No user_response in LLM response - this is okay for some system prompts")
                 final_sarthi_message = "Thank you for sharing that with me."
             
-            # Process system_response if present (this is often the main purpose)
-            if system_response:
-                logger.info(f"Processing system_response: {system_response}")
-                await update_database_with_system_message(db, system_response, reflection_id)
-            else:
-                logger.info("No system_response to process")
+            if not system_response:
+                logger.debug("No system_response to process")
                 
-        except (json.JSONDecodeError, KeyError, ValueError, TypeError, LLMProcessingError) as e:
-            logger.error(f"LLM processing failed for stage {current_stage}: {e}")
+        except (KeyError, ValueError, TypeError, LLMProcessingError) as e:
+            logger.error("LLM processing failed for stage %s: %s", current_stage, e)
             raise LLMProcessingError(f"LLM processing failed: {str(e)}")
     
-    # Step 3: Save user message to chat history if present
-    if request and request.message:
-        logger.info(f"Saving user message to chat history: '{request.message}'")
-        db_handler.save_message(db, reflection_id, request.message, sender=0, stage_no=current_stage)
+    # Steps 3 and 4 are written together: the messages go in one multi-row INSERT, and the
+    # system_response fields and stage in one UPDATE, all under a single commit
+    messages = db_handler.MessageBuffer()
+
+    # Step 3: Save user message to chat history if present (the system prompt branch already did)
+    if prompt_type == 0 and request and request.message:
+        logger.debug("Saving user message to chat history: '%s'", request.message)
+        messages.add(reflection_id, request.message, sender=0, stage_no=current_stage)
 
     # Step 4: Update current_stage ONLY if next_stage is not null
     if next_stage is not None:
-        logger.info(f"Updating reflection current_stage from {current_stage} to {next_stage}")
-        db_handler.update_reflection_stage(db, reflection_id, next_stage)
+        logger.info("Updating reflection current_stage from %s to %s", current_stage, next_stage)
 
         # Conditionally save Sarthi's response, skipping for stage 17
         if next_stage != 17:
             # Save Sarthi response with new stage
-            db_handler.save_message(db, reflection_id, final_sarthi_message, sender=1, stage_no=next_stage)
-            logger.info(f"Saved Sarthi message: '{final_sarthi_message}' at stage {next_stage}")
+            messages.add(reflection_id, final_sarthi_message, sender=1, stage_no=next_stage)
+            logger.debug("Saving Sarthi message: '%s' at stage %s", final_sarthi_message, next_stage)
     else:
-        logger.warning(f"next_stage is null for stage {current_stage} - NOT updating reflection.current_stage")
+        logger.warning("next_stage is null for stage %s - NOT updating reflection.current_stage", current_stage)
         
         # Save Sarthi response at current stage (don't advance)
-        db_handler.save_message(db, reflection_id, final_sarthi_message, sender=1, stage_no=current_stage)
-        logger.info(f"Saved Sarthi message: '{final_sarthi_message}' at current stage {current_stage}")
+        messages.add(reflection_id, final_sarthi_message, sender=1, stage_no=current_stage)
+        logger.debug("Saving Sarthi message: '%s' at current stage %s", final_sarthi_message, current_stage)
+
+    await update_database_with_system_message(db, system_response or {}, reflection_id, next_stage, messages)
     
-    return final_sarthi_message, system_response
+    return final_sarthi_message, system_response, next_stage if next_stage is not None else current_stage
 
 async def process_and_respond(db: Session, current_stage: int, reflection_id: uuid.UUID, chat_id: uuid.UUID, request: MessageRequest = None) -> MessageResponse:
     """Process stage with proper error handling"""
     try:
-        sarthi_message, _ = await _base_process_and_respond(db, current_stage, reflection_id, chat_id, request)
-        reflection = db_handler.get_reflection_by_id(db, reflection_id)
+        # The stage is known from the prompt config; re-reading the reflection after the commits would be another SELECT
+        sarthi_message, _, next_stage = await _run_stage(db, current_stage, reflection_id, chat_id, request)
         
         return MessageResponse(
             success=True, 
             reflection_id=str(reflection_id), 
             sarthi_message=sarthi_message, 
             current_stage=current_stage, 
-            next_stage=reflection.current_stage
+            next_stage=next_stage
         )
         
     except LLMProcessingError as e:
-        logger.error(f"Stage {current_stage} processing failed: {e}")
+        logger.error("Stage %s processing failed: %s", current_stage, e)
         
         # Return error message but DON'T advance stage
         error_message = "I'm having some technical difficulties processing your message. Could you please try again?"
         
         # Save error message at current stage (don't advance)
-        db_handler.save_message(db, reflection_id, error_message, sender=1, stage_no=current_stage)
+        await db_handler.run_sync(db_handler.save_message, db, reflection_id, error_message, sender=1, stage_no=current_stage)
         
         return MessageResponse(
             success=False, 
@@ -224,12 +267,19 @@ async def process_and_respond(db: Session, current_stage: int, reflection_id: uu
             next_stage=current_stage  # Stay at same stage for retry
         )
 
+# "Continue the previous chat?" options, and the labels stored with the user's answer
+_CONTINUE_CHOICES = ({"choice": "1", "label": "Yes"}, {"choice": "0", "label": "No"})
+_CONTINUE_CHOICE_LABELS = {"1": "Continue previous conversation", "0": "Start new conversation"}
+
+# is_delivered values (completed, locked, closed) after which a new reflection is started
+_FINISHED_STATUSES = frozenset({1, 2, 3})
+
 # Rest of the functions remain the same...
 async def handle_initial_flow(db: Session, request: MessageRequest, user_id: uuid.UUID, chat_id: uuid.UUID) -> Union[MessageResponse, uuid.UUID]:
-    latest_reflection = db_handler.get_latest_reflection_by_chat_id(db, chat_id)
+    latest_reflection = await db_handler.run_sync(db_handler.get_latest_reflection_by_chat_id, db, chat_id)
     
     # Allow new reflection creation for completed (1) OR locked (2) reflections
-    if not latest_reflection or latest_reflection.is_delivered in [1, 2, 3]:
+    if not latest_reflection or latest_reflection.is_delivered in _FINISHED_STATUSES:
         return await handle_create_new_reflection(db, chat_id)
     
     # Only ask to continue for active/incomplete reflections (is_delivered = 0)
@@ -240,17 +290,15 @@ async def handle_incomplete_reflection(db: Session, request: MessageRequest, ref
 
     if request.data and len(request.data) > 0:
         choice_data = request.data[0]
-        if choice_data.get("choice") == "1":
-            choice_data["label"] = "Continue previous conversation"
-        elif choice_data.get("choice") == "0":
-            choice_data["label"] = "Start new conversation"
+        if choice_data.get("choice") in _CONTINUE_CHOICE_LABELS:
+            choice_data["label"] = _CONTINUE_CHOICE_LABELS[choice_data["choice"]]
         
-        db_handler.save_user_choice_message(db, reflection.reflection_id, choice_data, reflection.current_stage)
+        await db_handler.run_sync(db_handler.save_user_choice_message, db, reflection.reflection_id, choice_data, reflection.current_stage)
 
 
     if user_choice == "1":
         clean_request = MessageRequest(
-            reflection_id=str(reflection.reflection_id),
+            reflection_id=reflection.reflection_id,
             message="",  # Empty message since we're continuing from where we left off
             data=[]      # No data since we already processed the choice
         )
@@ -258,8 +306,8 @@ async def handle_incomplete_reflection(db: Session, request: MessageRequest, ref
     
     if user_choice == "0":
         return await handle_create_new_reflection(db, chat_id)
-    return MessageResponse(success=True, reflection_id=str(reflection.reflection_id), sarthi_message="Welcome back! Do you want to continue the previous chat?", data=[{"choice": "1", "label": "Yes"}, {"choice": "0", "label": "No"}])
+    return MessageResponse(success=True, reflection_id=str(reflection.reflection_id), sarthi_message="Welcome back! Do you want to continue the previous chat?", data=_CONTINUE_CHOICES)
 
 async def handle_create_new_reflection(db: Session, chat_id: uuid.UUID) -> MessageResponse:
-    reflection_id = db_handler.create_new_reflection(db, chat_id)
+    reflection_id = await db_handler.run_sync(db_handler.create_new_reflection, db, chat_id)
     return await process_and_respond(db, 0, reflection_id, chat_id)
\ No newline at end of file
@@ -0,0 +1,118 @@
+# app/handlers/message_queue.py
+"""
+Write-behind queue for chat history rows that the response doesn't depend on.
+A single background worker batches queued rows and inserts each batch with one
+multi-row INSERT. Stage and status updates stay synchronous in db_handler.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Optional
+from app.database import SessionLocal
+from app.handlers.database import MessageBuffer
+
+logger = logging.getLogger(__name__)
+
+# A batch is written once it reaches MAX_BATCH_SIZE rows or FLUSH_INTERVAL_SECONDS after its first row
+FLUSH_INTERVAL_SECONDS = 0.05
+MAX_BATCH_SIZE = 100
+# A failed batch is retried this many times before its rows are written one by one
+WRITE_RETRIES = 2
+RETRY_DELAY_SECONDS = 0.5
+
+_queue: Optional[asyncio.Queue] = None
+_worker: Optional[asyncio.Task] = None
+# Strong references to writes scheduled while the worker isn't running
+_pending_writes: set = set()
+
+
+def _insert_rows(rows: list):
+    db = SessionLocal()
+    try:
+        MessageBuffer(rows).flush(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _write_rows(rows: list):
+    for attempt in range(1 + WRITE_RETRIES):
+        try:
+            _insert_rows(rows)
+            return
+        except Exception as e:
+            logger.warning("Write-behind insert of %s messages failed (attempt %s): %s", len(rows), attempt + 1, e)
+        time.sleep(RETRY_DELAY_SECONDS)
+    # One bad row shouldn't cost the rest of the batch
+    for row in rows:
+        try:
+            _insert_rows([row])
+        except Exception as e:
+            logger.error("Dropping chat history message for reflection %s at stage %s: %s", row["reflection_id"], row["current_stage"], e, exc_info=True)
+
+
+def enqueue_buffer(messages: MessageBuffer):
+    """Hand the buffered rows to the worker instead of flushing them on the request's session."""
+    rows = messages.drain()
+    if not rows:
+        return
+    if _queue is None:
+        # Worker not started (e.g. outside the app lifecycle): write in the background directly
+        task = asyncio.create_task(asyncio.to_thread(_write_rows, rows))
+        _pending_writes.add(task)
+        task.add_done_callback(_pending_writes.discard)
+        return
+    for row in rows:
+        _queue.put_nowait(row)
+
+
+def enqueue_message(reflection_id: uuid.UUID, message: str, sender: int, stage_no: int, is_distress: bool = False):
+    messages = MessageBuffer()
+    messages.add(reflection_id, message, sender=sender, stage_no=stage_no, is_distress=is_distress)
+    enqueue_buffer(messages)
+
+
+async def _run_worker(queue: asyncio.Queue):
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        row = await queue.get()
+        if row is None:
+            break
+        batch = [row]
+        deadline = loop.time() + FLUSH_INTERVAL_SECONDS
+        while len(batch) < MAX_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                row = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if row is None:
+                stopping = True
+                break
+            batch.append(row)
+        await asyncio.to_thread(_write_rows, batch)
+
+
+def start():
+    global _queue, _worker
+    if _worker is None:
+        _queue = asyncio.Queue()
+        _worker = asyncio.create_task(_run_worker(_queue))
+
+
+async def stop():
+    """Write out everything queued so far, then stop the worker."""
+    global _queue, _worker
+    if _worker is None:
+        return
+    _queue.put_nowait(None)
+    await _worker
+    _queue, _worker = None, None
+    if _pending_writes:
+        await asyncio.gather(*_pending_writes, return_exceptions=True)
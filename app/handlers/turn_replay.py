@@ -0,0 +1,83 @@
+# app/handlers/turn_replay.py
+"""
+Replay of chat responses for retried client messages. The client sends a
+client_message_id with each message and keeps it on retries and double submits,
+so a repeat gets the reply the first submission got instead of another round of
+distress, intent and stage LLM calls and stage transitions. Without an id every
+message is processed as new: a user can legitimately send the same text twice.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import orjson
+from app.schemas import MessageRequest, MessageResponse
+
+logger = logging.getLogger(__name__)
+
+
+def _message_digest(request: MessageRequest) -> bytes:
+    """Digest of what the user sent: reflection, text and any choice data."""
+    digest = hashlib.blake2b(str(request.reflection_id).encode(), digest_size=16)
+    digest.update(b"\0" + (request.message or "").encode())
+    digest.update(b"\0" + orjson.dumps(request.data, option=orjson.OPT_SORT_KEYS))
+    return digest.digest()
+
+
+class TurnReplayCache:
+    """Recent responses by (chat_id, client_message_id), with the submissions in flight"""
+
+    def __init__(self, config):
+        self.config = config
+        # (chat_id, client_message_id) -> (expires_at, message digest, encoded response), oldest first
+        self._responses: "OrderedDict[Tuple[str, str], Tuple[float, bytes, bytes]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], Tuple[bytes, asyncio.Future]] = {}
+
+    async def run(self, chat_id: uuid.UUID, request: MessageRequest, process: Callable[[], Awaitable[MessageResponse]]) -> MessageResponse:
+        """
+        Return the earlier response when this is a repeat of a message already answered,
+        otherwise process it. Only successful responses are kept for replay.
+        """
+        if not request.client_message_id or self.config.replay_ttl <= 0:
+            return await process()
+
+        key = (str(chat_id), request.client_message_id)
+        digest = _message_digest(request)
+        cached = self._responses.get(key)
+        if cached and cached[0] > time.monotonic():
+            if cached[1] == digest:
+                logger.info("Replaying response to client message %s for chat %s", key[1], key[0])
+                return MessageResponse.model_validate_json(cached[2])
+            logger.warning("Client message id %s reused for a different message in chat %s; processing it as new", key[1], key[0])
+
+        in_flight = self._in_flight.get(key)
+        if in_flight and in_flight[0] == digest:
+            encoded = await asyncio.shield(in_flight[1])
+            # None when the first submission failed or was cancelled; process this one
+            if encoded is not None:
+                return MessageResponse.model_validate_json(encoded)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (digest, future)
+        encoded: Optional[bytes] = None
+        try:
+            response = await process()
+            if response.success:
+                encoded = response.model_dump_json().encode()
+                self._store(key, digest, encoded)
+            return response
+        finally:
+            if self._in_flight.get(key, (None, None))[1] is future:
+                del self._in_flight[key]
+            future.set_result(encoded)
+
+    def _store(self, key: Tuple[str, str], digest: bytes, encoded: bytes):
+        now = time.monotonic()
+        self._responses[key] = (now + self.config.replay_ttl, digest, encoded)
+        self._responses.move_to_end(key)
+        # Every entry gets the same ttl, so insertion order is expiry order
+        while self._responses and (len(self._responses) > self.config.replay_cache_size or next(iter(self._responses.values()))[0] <= now):
+            self._responses.popitem(last=False)
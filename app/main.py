@@ -7,10 +7,11 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from app.orchestration import MessageOrchestrator
 from app.schemas import MessageRequest, MessageResponse
-from app.database import get_db, SessionLocal
+from app.database import get_db, SessionLocal, async_engine
 from app.services import prompt_engine_service, global_intent_classifier, llm_service
 from app.auth.utils import verify_token
 from app.auth.storage import AuthStorage
+from app.handlers import message_queue
 
 # --- Import routers from their specific locations ---
 from app.auth.api import router as auth_router
@@ -102,6 +103,7 @@ async def startup_event():
     try:
         await prompt_engine_service.initialize()
         cleanup_task = asyncio.create_task(cleanup_expired_otps())
+        message_queue.start()
         logging.info("All services initialized successfully!")
     except Exception as e:
         logging.error(f"Failed to initialize services: {str(e)}", exc_info=True)
@@ -119,9 +121,11 @@ async def shutdown_event():
             except asyncio.CancelledError:
                 logging.info("Background cleanup task cancelled")
         
+        await message_queue.stop()
         await prompt_engine_service.shutdown()
         await global_intent_classifier.shutdown()
         await llm_service.shutdown()
+        await async_engine.dispose()
         logging.info("All service connections closed successfully!")
     except Exception as e:
         logging.error(f"Error during shutdown: {str(e)}", exc_info=True)
\ No newline at end of file
@@ -1,6 +1,6 @@
 import uuid
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, BigInteger, Text, UniqueConstraint, SmallInteger
+    Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, BigInteger, Text, UniqueConstraint, SmallInteger, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, declarative_base
@@ -81,6 +81,11 @@ class Message(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     reflection = relationship("Reflection", back_populates="messages")
 
+    # Every message lookup filters by reflection and orders by recency (previous stage, last user message, history)
+    __table_args__ = (
+        Index('ix_messages_reflection_created_at', 'reflection_id', created_at.desc()),
+    )
+
 class Feedback(Base):
     __tablename__ = 'feedback'
     feedback_no = Column(Integer, primary_key=True)
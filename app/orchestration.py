@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from app.schemas import MessageRequest, MessageResponse
 from app.handlers import initial, distress, global_intent, normal_flow
 from app.handlers import database as db_handler
+from app.services import turn_replay
 import uuid
 import logging
 
@@ -12,6 +13,10 @@ class MessageOrchestrator:
         self.logger = logging.getLogger(__name__)
 
     async def process_message(self, request: MessageRequest, user_id: uuid.UUID, chat_id: uuid.UUID) -> MessageResponse:
+        # A retried or double-submitted message gets the reply it already got, ahead of any LLM call
+        return await turn_replay.run(chat_id, request, lambda: self._process_message(request, user_id, chat_id))
+
+    async def _process_message(self, request: MessageRequest, user_id: uuid.UUID, chat_id: uuid.UUID) -> MessageResponse:
         try:
             # ADD THESE DEBUG LOGS:
             print(f" TEST: Orchestrator called with reflection_id: {request.reflection_id}")
@@ -25,15 +30,8 @@ class MessageOrchestrator:
 
             self.logger.info(f" ORCHESTRATOR: Has reflection_id - entering core flow")
             
-            # FIXED: Add validation for reflection_id before processing
-            try:
-                uuid.UUID(request.reflection_id)  # Validate it's a proper UUID
-            except (ValueError, TypeError):
-                self.logger.error(f"Invalid reflection_id format: {request.reflection_id}")
-                return MessageResponse(success=False, sarthi_message="Invalid reflection ID format.")
-            
             # ADD THIS DEBUG - Check the reflection's current stage:
-            reflection = db_handler.get_reflection_by_id(self.db, uuid.UUID(request.reflection_id))
+            reflection = await db_handler.run_sync(db_handler.get_reflection_by_id, self.db, request.reflection_id)
             if reflection:
                 current_stage = reflection.current_stage
                 flow_type = reflection.flow_type
@@ -42,9 +40,14 @@ class MessageOrchestrator:
                 self.logger.info(f" ORCHESTRATOR: No reflection found!")
                 return MessageResponse(success=False, sarthi_message="Reflection not found.")
             
+            # The distress check and the global intent classification are independent LLM calls; overlap them
+            classification = global_intent.prefetch_classification(request, current_stage)
+            
             self.logger.info(f" ORCHESTRATOR: Checking distress...")
             if (distress_response := await distress.handle_distress_check(self.db, request)): 
                 self.logger.info(f" ORCHESTRATOR: Distress detected - returning distress response")
+                if classification:
+                    classification.cancel()
                 return distress_response
             
             if current_stage != 27:
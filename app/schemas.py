@@ -1,12 +1,20 @@
 # app/schemas.py - COMPLETE UPDATED VERSION
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional, List, Dict, Any
 import uuid
 
 class MessageRequest(BaseModel):
-    reflection_id: Optional[str] = None
+    reflection_id: Optional[uuid.UUID] = None
     message: Optional[str] = ""
     data: List[Dict[str, Any]] = []
+    # Set by the client once per message it sends and kept on retries of that message
+    client_message_id: Optional[str] = None
+
+    @field_validator("reflection_id", mode="before")
+    @classmethod
+    def empty_reflection_id_as_none(cls, value):
+        # Clients send "" instead of null when starting a new reflection
+        return value or None
 
 class MessageResponse(BaseModel):
     success: bool
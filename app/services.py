@@ -5,6 +5,7 @@ from distress_detection.detector import DistressDetector
 from llm_system.client import LLMClient
 from config import AppConfig
 from delivery_service.service import DeliveryService
+from app.handlers.turn_replay import TurnReplayCache
 import uuid
 
 class DeliveryServiceWrapper:
@@ -65,4 +66,5 @@ global_intent_classifier = GlobalIntentClassifierService(
     config=config.global_intent_classifier
 )
 
-delivery_service = DeliveryServiceWrapper()
\ No newline at end of file
+delivery_service = DeliveryServiceWrapper()
+turn_replay = TurnReplayCache(config=config.turn_replay)
\ No newline at end of file
@@ -15,6 +15,7 @@ class PromptEngineConfig:
     max_pool_connections: int = 10
     min_pool_connections: int = 2
     connection_timeout: int = 30
+    prompt_cache_ttl: int = 300
 
     @classmethod
     def from_env(cls) -> 'PromptEngineConfig':
@@ -25,18 +26,58 @@ class PromptEngineConfig:
             supabase_connection_string=connection_string,
             max_pool_connections=int(os.getenv('PROMPT_MAX_POOL_CONNECTIONS', '10')),
             min_pool_connections=int(os.getenv('PROMPT_MIN_POOL_CONNECTIONS', '2')),
-            connection_timeout=int(os.getenv('PROMPT_CONNECTION_TIMEOUT', '30'))
+            connection_timeout=int(os.getenv('PROMPT_CONNECTION_TIMEOUT', '30')),
+            prompt_cache_ttl=int(os.getenv('PROMPT_CACHE_TTL', '300'))
+        )
+
+@dataclass
+class DatabaseConfig:
+    """SQLAlchemy connection pool configuration for the app database"""
+    pool_size: int = 20
+    max_overflow: int = 10
+    pool_recycle: int = 1800
+    pool_timeout: int = 10
+    # The async engine only serves the reflection read endpoints
+    async_pool_size: int = 5
+    async_max_overflow: int = 5
+
+    @classmethod
+    def from_env(cls) -> 'DatabaseConfig':
+        return cls(
+            pool_size=int(os.getenv('DB_POOL_SIZE', '20')),
+            max_overflow=int(os.getenv('DB_MAX_OVERFLOW', '10')),
+            pool_recycle=int(os.getenv('DB_POOL_RECYCLE', '1800')),
+            pool_timeout=int(os.getenv('DB_POOL_TIMEOUT', '10')),
+            async_pool_size=int(os.getenv('DB_ASYNC_POOL_SIZE', '5')),
+            async_max_overflow=int(os.getenv('DB_ASYNC_MAX_OVERFLOW', '5'))
+        )
+
+@dataclass
+class TurnReplayConfig:
+    """Replay of chat responses for retried client messages"""
+    replay_ttl: int = 300
+    replay_cache_size: int = 4096
+
+    @classmethod
+    def from_env(cls) -> 'TurnReplayConfig':
+        return cls(
+            replay_ttl=int(os.getenv('TURN_REPLAY_TTL', '300')),
+            replay_cache_size=int(os.getenv('TURN_REPLAY_CACHE_SIZE', '4096'))
         )
 
 @dataclass
 class GlobalIntentClassifierConfig:
     """Global Intent Classifier specific configuration"""
     intent_classifier_stage_id: int = 21
+    classification_cache_ttl: int = 60
+    classification_cache_size: int = 2048
 
     @classmethod
     def from_env(cls) -> 'GlobalIntentClassifierConfig':
         return cls(
-            intent_classifier_stage_id=int(os.getenv('GIC_INTENT_STAGE_ID', '21'))
+            intent_classifier_stage_id=int(os.getenv('GIC_INTENT_STAGE_ID', '21')),
+            classification_cache_ttl=int(os.getenv('GIC_CLASSIFICATION_CACHE_TTL', '60')),
+            classification_cache_size=int(os.getenv('GIC_CLASSIFICATION_CACHE_SIZE', '2048'))
         )
 
 @dataclass
@@ -57,6 +98,9 @@ class LLMConfig:
     whatsapp_access_token: str = ""
     whatsapp_phone_number_id: str = ""
     whatsapp_template_name: str = "authentication"
+    max_concurrent_requests: int = 10
+    response_cache_ttl: int = 300
+    response_cache_size: int = 4096
 
     @classmethod
     def from_env(cls) -> 'LLMConfig':
@@ -84,7 +128,10 @@ class LLMConfig:
             zeptomail_from_name=os.getenv('ZEPTOMAIL_FROM_NAME', 'Sarthi'),
             whatsapp_access_token=os.getenv('WHATSAPP_ACCESS_TOKEN', ''),
             whatsapp_phone_number_id=os.getenv('WHATSAPP_PHONE_NUMBER_ID', ''),
-            whatsapp_template_name=os.getenv('WHATSAPP_TEMPLATE_NAME', 'authentication')
+            whatsapp_template_name=os.getenv('WHATSAPP_TEMPLATE_NAME', 'authentication'),
+            max_concurrent_requests=int(os.getenv('LLM_CONCURRENCY', '10')),
+            response_cache_ttl=int(os.getenv('LLM_RESPONSE_CACHE_TTL', '300')),
+            response_cache_size=int(os.getenv('LLM_RESPONSE_CACHE_SIZE', '4096'))
         )
 
 @dataclass
@@ -119,6 +166,8 @@ class AppConfig:
     This is the single, correct version of the class.
     """
     prompt_engine: PromptEngineConfig
+    database: DatabaseConfig
+    turn_replay: TurnReplayConfig
     global_intent_classifier: GlobalIntentClassifierConfig
     llm: LLMConfig
     distress: DistressConfig
@@ -128,6 +177,8 @@ class AppConfig:
         """Load all configurations from environment variables"""
         return cls(
             prompt_engine=PromptEngineConfig.from_env(),
+            database=DatabaseConfig.from_env(),
+            turn_replay=TurnReplayConfig.from_env(),
             global_intent_classifier=GlobalIntentClassifierConfig.from_env(),
             llm=LLMConfig.from_env(),
             distress=DistressConfig.from_env()
@@ -1,5 +1,6 @@
 # delivery_service/service.py
 
+import asyncio
 import logging
 import uuid
 from typing import Dict, Any
@@ -207,19 +208,23 @@ class DeliveryService:
         recipient_email = recipient_contact.get("recipient_email") if recipient_contact else None
         recipient_phone = recipient_contact.get("recipient_phone") if recipient_contact else None
 
+        deliveries = []
         if delivery_mode in [0, 2] and recipient_email:
-            try:
-                await self._deliver_via_email(sender_user, summary, reflection, recipient_email, delivery_status, db)
-                delivery_status.append("email_sent")
-            except Exception as e:
-                self.logger.warning(f"Email delivery failed: {e}")
+            deliveries.append(("email_sent", "Email", self._deliver_via_email(sender_user, summary, reflection, recipient_email, delivery_status, db)))
         
         if delivery_mode in [1, 2] and recipient_phone:
-            try:
-                await self._deliver_via_whatsapp(sender_user, summary, reflection, recipient_phone, delivery_status, db)
-                delivery_status.append("whatsapp_sent")
-            except Exception as e:
-                self.logger.warning(f"WhatsApp delivery failed: {e}")
+            deliveries.append(("whatsapp_sent", "WhatsApp", self._deliver_via_whatsapp(sender_user, summary, reflection, recipient_phone, delivery_status, db)))
+
+        # The providers are independent HTTP calls, so "Both" sends them at once. Each delivery's
+        # recipient-user writes run before its first await, so they still happen in the order above.
+        results = await asyncio.gather(*(delivery for _, _, delivery in deliveries), return_exceptions=True)
+        for (status, channel, _), result in zip(deliveries, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                self.logger.warning(f"{channel} delivery failed: {result}")
+            else:
+                delivery_status.append(status)
 
         if not delivery_status:
             raise HTTPException(status_code=500, detail="All selected delivery methods failed.")
@@ -1,7 +1,6 @@
 # =======================================================================
 # global_intent_classifier/llm_service_client.py (Corrected)
 # =======================================================================
-import json
 import logging
 from typing import Dict, Any
 from .exceptions import LLMServiceError
@@ -23,9 +22,7 @@ class LLMServiceClient:
                 "prompt": prompt,
                 "user_message": user_message
             }
-            # Assuming llm_service has a method like process_json_request
-            llm_response_json = await self.llm_service.process_json_request(json.dumps(llm_request))
-            llm_response_data = json.loads(llm_response_json)
+            llm_response_data = await self.llm_service.process_dict_request(llm_request)
 
             # FIXED: Use .get() to safely access keys that might be missing.
             # This provides a default empty dictionary {} if a key is not found,
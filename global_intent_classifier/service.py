@@ -1,6 +1,10 @@
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, Any, Optional
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 from .models import ConversationRequest, IntentResult
 from .llm_service_client import LLMServiceClient
 from .message_fetcher import MessageFetcher
@@ -16,11 +20,58 @@ class GlobalIntentClassifierService:
         self.message_fetcher = MessageFetcher(message_service)
         self.config = config
         self.logger = logging.getLogger(__name__)
+        # (reflection_id, message digest) -> (expires_at, result) in LRU order, and the classifications in flight
+        self._result_cache: "OrderedDict[Tuple[str, bytes], Tuple[float, IntentResult]]" = OrderedDict()
+        self._in_flight: Dict[Tuple[str, bytes], asyncio.Future] = {}
+        self._next_sweep = 0.0
 
     async def classify_intent(self, reflection_id: str, user_message: str) -> IntentResult:
         """
         Main method to get the final universal response from the LLM.
+        Repeated turns with the same message for a reflection reuse a recent result,
+        and identical concurrent calls share one LLM request.
         """
+        # Case and whitespace don't change the intent, so re-sends that differ only in those share an entry
+        normalized = " ".join((user_message or "").split()).lower()
+        key = (reflection_id, hashlib.blake2b(normalized.encode(), digest_size=16).digest())
+        now = time.monotonic()
+        cached = self._result_cache.get(key)
+        if cached and cached[0] > now:
+            self._result_cache.move_to_end(key)
+            return cached[1]
+        
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            result = await asyncio.shield(in_flight)
+            # None when the call that owned the entry was cancelled or failed; classify again
+            if result is not None:
+                return result
+        
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        result = None
+        try:
+            result = await self._classify_intent(reflection_id, user_message)
+            # The LLM client answers failures with a fallback result; don't keep serving it
+            if "error" not in result.system_response:
+                self._store_result(key, result)
+            return result
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+            future.set_result(result)
+
+    def _store_result(self, key: Tuple[str, bytes], result: IntentResult):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._result_cache = OrderedDict((k, v) for k, v in self._result_cache.items() if v[0] > now)
+            self._next_sweep = now + self.config.classification_cache_ttl
+        self._result_cache[key] = (now + self.config.classification_cache_ttl, result)
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > self.config.classification_cache_size:
+            self._result_cache.popitem(last=False)
+
+    async def _classify_intent(self, reflection_id: str, user_message: str) -> IntentResult:
         try:
             classifier_prompt_data = await self._get_classifier_prompt()
             llm_result = await self.llm_client.classify_intent(
@@ -37,8 +88,8 @@ class GlobalIntentClassifierService:
             raise IntentClassifierError(f"Failed to classify intent: {e}")
 
     async def _get_classifier_prompt(self) -> Dict[str, Any]:
-        request_data = {"stage_id": self.config.intent_classifier_stage_id, "data": {}}
-        response = await self.prompt_engine.process_dict_request(request_data)
+        # The classifier prompt has no substitution data, so the prompt engine can serve it from cache
+        response = await self.prompt_engine.get_stage_prompt(self.config.intent_classifier_stage_id)
         if not response.get("prompt"):
             raise PromptEngineError("No prompt returned for classifier stage")
         return response
@@ -1,14 +1,29 @@
 from __future__ import annotations
-import json
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, TYPE_CHECKING
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, Tuple, TYPE_CHECKING
 from .persona import GOLDEN_PERSONA_PROMPT
+import httpx
 import openai
+import orjson
 
 
 if TYPE_CHECKING:
     from config import LLMConfig
 
+
+@lru_cache(maxsize=128)
+def _build_system_prompt(task_prompt: str) -> str:
+    """
+    System prompt for a task prompt. The provider reuses cached prefix computation only on an
+    exact match, so every turn of a stage must send the byte-identical string built here.
+    """
+    return f"{GOLDEN_PERSONA_PROMPT}\n\n--- TASK CONTEXT ---\n{task_prompt}\n\nEnsure your response is a valid JSON object."
+
 class LLMClient:
     """
     Client to interact with the OpenAI LLM, enforcing the Golden Persona.
@@ -17,9 +32,24 @@ class LLMClient:
     def __init__(self, config: LLMConfig):
         self.config = config
         self.logger = logging.getLogger(__name__)
-        self.client = openai.OpenAI(api_key=self.config.api_key)
+        # Keep one warm connection per request slot, so concurrent turns reuse TLS sessions instead of reconnecting
+        self.client = openai.AsyncOpenAI(
+            api_key=self.config.api_key,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.config.max_concurrent_requests,
+                    max_keepalive_connections=self.config.max_concurrent_requests
+                )
+            )
+        )
+        # Caps concurrent provider calls so bursts queue here instead of tripping rate limits
+        self._request_slots = asyncio.Semaphore(self.config.max_concurrent_requests)
+        # (reflection, system prompt, user message) digest -> (expires_at, encoded response) in LRU order, and the calls in flight
+        self._response_cache: "OrderedDict[bytes, Tuple[float, bytes]]" = OrderedDict()
+        self._in_flight: Dict[bytes, asyncio.Future] = {}
+        self._next_sweep = 0.0
 
-    async def chat_completion(self, system_prompt: str, user_message: str, persona: str = None, reflection_id: str = None) -> str:
+    async def chat_completion(self, system_prompt: str, user_message: str, persona: str = None, reflection_id: str = None, prompt_cache_key: str = None) -> str:
         """
         Generates a chat completion using the LLM.
         This is a convenience method that wraps process_json_request.
@@ -32,19 +62,95 @@ class LLMClient:
             "prompt": system_prompt,
             "user_message": user_message
         }
-        return await self.process_json_request(json.dumps(llm_request))
+        if prompt_cache_key:
+            llm_request["prompt_cache_key"] = prompt_cache_key
+        return orjson.dumps(await self.process_dict_request(llm_request)).decode()
 
     async def process_json_request(self, json_input: str) -> str:
         """
-        Processes a JSON request, adds the golden persona, calls the LLM,
+        JSON wrapper around process_dict_request for callers that exchange JSON strings.
+        """
+        try:
+            input_data = orjson.loads(json_input)
+        except orjson.JSONDecodeError as e:
+            self.logger.error(f"LLM request failed: {e}")
+            return orjson.dumps(self._mock_llm_failure_response(None)).decode()
+        return orjson.dumps(await self.process_dict_request(input_data)).decode()
+
+    async def process_dict_request(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Processes a request, adds the golden persona, calls the LLM,
         and normalizes the response to expected format.
         """
+        return await self._process_dict_request(input_data)
+
+    async def process_stage_request(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        process_dict_request for a reflection's stage turn. An exact repeat of a recent
+        prompt and user message in the same reflection reuses that response, and
+        identical concurrent calls share one LLM request.
+        """
+        reflection_id = input_data.get("reflection_id")
+        if self.config.response_cache_ttl <= 0:
+            return await self._process_dict_request(input_data)
+
+        final_prompt_for_llm = _build_system_prompt(str(input_data.get('prompt')))
+        digest = hashlib.blake2b(str(reflection_id).encode(), digest_size=16)
+        digest.update(b"\0" + final_prompt_for_llm.encode())
+        digest.update(b"\0" + str(input_data.get("user_message", "")).encode())
+        key = digest.digest()
+        now = time.monotonic()
+        cached = self._response_cache.get(key)
+        if cached and cached[0] > now:
+            self._response_cache.move_to_end(key)
+            return self._decode_cached(cached[1], reflection_id)
+
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            encoded = await asyncio.shield(in_flight)
+            # None when the call that owned the entry was cancelled or failed; make our own
+            if encoded is not None:
+                return self._decode_cached(encoded, reflection_id)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        encoded = None
+        try:
+            response = await self._process_dict_request(input_data)
+            # Failures are answered with the fallback response; don't keep serving it
+            if "error" not in (response.get("system_response") or {}):
+                # Callers get their own copy on a hit, so the cached response is kept encoded
+                encoded = orjson.dumps(response)
+                self._store_response(key, encoded)
+            return response
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+            future.set_result(encoded)
+
+    @staticmethod
+    def _decode_cached(encoded: bytes, reflection_id: str) -> Dict[str, Any]:
+        response = orjson.loads(encoded)
+        response["reflection_id"] = reflection_id
+        return response
+
+    def _store_response(self, key: bytes, encoded: bytes):
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._response_cache = OrderedDict((k, v) for k, v in self._response_cache.items() if v[0] > now)
+            self._next_sweep = now + self.config.response_cache_ttl
+        self._response_cache[key] = (now + self.config.response_cache_ttl, encoded)
+        self._response_cache.move_to_end(key)
+        while len(self._response_cache) > self.config.response_cache_size:
+            self._response_cache.popitem(last=False)
+
+    async def _process_dict_request(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        reflection_id = input_data.get("reflection_id")
         try:
-            input_data = json.loads(json_input)
-            reflection_id = input_data.get("reflection_id")
             user_message = input_data.get("user_message", "")
+            prompt_cache_key = input_data.get("prompt_cache_key")
             
-            final_prompt_for_llm = f"{GOLDEN_PERSONA_PROMPT}\n\n--- TASK CONTEXT ---\n{input_data.get('prompt')}\n\nEnsure your response is a valid JSON object."
+            final_prompt_for_llm = _build_system_prompt(str(input_data.get('prompt')))
             print(f"🚨 LLM_CLIENT: Calling OpenAI with model: {self.config.model}")
             print(f"🚨 LLM_CLIENT: User message: {user_message}")
             print(f"🚨 LLM_CLIENT: Final prompt length: {len(final_prompt_for_llm)}")
@@ -52,20 +158,25 @@ class LLMClient:
 
             self.logger.info(f"Sending request to OpenAI model '{self.config.model}'")
             
-            response = self.client.chat.completions.create(
-                model=self.config.model,
-                messages=[
-                    {"role": "system", "content": final_prompt_for_llm},
-                    {"role": "user", "content": user_message}
-                ],
-                response_format={"type": "json_object"}
-            )
+            # The system prompt is a stable prefix (persona + stage prompt), so OpenAI caches it
+            # automatically; the cache key routes a conversation's turns to the same cache.
+            extra_body = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else None
+            async with self._request_slots:
+                response = await self.client.chat.completions.create(
+                    model=self.config.model,
+                    messages=[
+                        {"role": "system", "content": final_prompt_for_llm},
+                        {"role": "user", "content": user_message}
+                    ],
+                    response_format={"type": "json_object"},
+                    extra_body=extra_body
+                )
             llm_response_content = response.choices[0].message.content
             print(f"🚨 LLM_CLIENT: Raw OpenAI response: {llm_response_content}")
             
             
             if llm_response_content:
-                raw_response = json.loads(llm_response_content)
+                raw_response = orjson.loads(llm_response_content)
                 print(f"🚨 LLM_CLIENT: Parsed OpenAI response: {raw_response}")
                 self.logger.info(f"Raw LLM response: {raw_response}")
                 
@@ -73,13 +184,13 @@ class LLMClient:
                 print(f"🚨 LLM_CLIENT: Normalized response: {normalized_response}")
                 self.logger.info(f"Normalized response: {normalized_response}")
                 
-                return json.dumps(normalized_response)
+                return normalized_response
             else:
                 raise ValueError("LLM returned an empty response.")
 
         except Exception as e:
             self.logger.error(f"LLM request failed: {e}")
-            return await self._mock_llm_failure_response(reflection_id)
+            return self._mock_llm_failure_response(reflection_id)
 
     def _normalize_response(self, raw_response: Dict[str, Any], reflection_id: str) -> Dict[str, Any]:
         """
@@ -163,7 +274,7 @@ class LLMClient:
         
         return "I hear what you're sharing with me."
 
-    async def _mock_llm_failure_response(self, reflection_id: str) -> str:
+    def _mock_llm_failure_response(self, reflection_id: str) -> Dict[str, Any]:
         """A fallback to prevent crashes if the real LLM call fails."""
         response = {
             "reflection_id": reflection_id,
@@ -176,7 +287,8 @@ class LLMClient:
                 "message": "I'm sorry, I seem to be having technical difficulties. Please try again in a moment."
             }
         }
-        return json.dumps(response)
+        return response
 
     async def shutdown(self):
+        await self.client.close()
         self.logger.info("LLM Client shutdown.")
\ No newline at end of file
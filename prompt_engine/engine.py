@@ -36,14 +36,7 @@ class AsyncPromptEngine:
         try:
             prompt_data = await self.db_manager.get_prompt_by_stage_id(request.stage_id)
             
-            processed_prompt = await self._process_prompt_text(prompt_data, request.data)
-            
-            return PromptResponse(
-                prompt=processed_prompt,
-                is_static=prompt_data.is_static,
-                prompt_type=prompt_data.prompt_type,
-                next_stage=prompt_data.next_stage
-            )
+            return await self.build_response(prompt_data, request.data)
             
             
         except (StageNotFoundError, InvalidDataError) as e:
@@ -53,6 +46,19 @@ class AsyncPromptEngine:
             self.logger.error(f"Unexpected error in prompt processing: {e}")
             raise PromptEngineError(f"Failed to process prompt: {e}")
     
+    async def build_response(self, prompt_data: PromptData, data: Dict[str, Any]) -> PromptResponse:
+        """
+        Render an already fetched stage row into a PromptResponse
+        """
+        processed_prompt = await self._process_prompt_text(prompt_data, data)
+        
+        return PromptResponse(
+            prompt=processed_prompt,
+            is_static=prompt_data.is_static,
+            prompt_type=prompt_data.prompt_type,
+            next_stage=prompt_data.next_stage
+        )
+    
     async def _process_prompt_text(self, prompt_data: PromptData, data: Dict[str, Any]) -> str:
         """
         Process prompt text based on is_static flag
@@ -1,6 +1,7 @@
 import json
 import logging
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Tuple
 from .engine import AsyncPromptEngine
 from .database import AsyncDatabaseManager
 from .models import PromptRequest, PromptResponse, PromptData
@@ -10,13 +11,16 @@ from .exceptions import PromptEngineError
 class PromptEngineService:
     """Main service class for the prompt engine"""
     
-    def __init__(self, connection_string: str, max_pool_size: int = 10, min_pool_size: int = 2, timeout: int = 30):
+    def __init__(self, connection_string: str, max_pool_size: int = 10, min_pool_size: int = 2, timeout: int = 30, cache_ttl: int = 300):
         """
         Initialize prompt engine service
         """
         self.logger = logging.getLogger(__name__)
         self.db_manager = AsyncDatabaseManager(connection_string, max_pool_size, min_pool_size, timeout)
         self.engine = AsyncPromptEngine(self.db_manager)
+        self.cache_ttl = cache_ttl
+        # stage_id -> (expires_at, stage row)
+        self._stage_data_cache: Dict[int, Tuple[float, PromptData]] = {}
         self._initialized = False
     
     @classmethod
@@ -28,7 +32,8 @@ class PromptEngineService:
             connection_string=prompt_config.supabase_connection_string,
             max_pool_size=prompt_config.max_pool_connections,
             min_pool_size=prompt_config.min_pool_connections,
-            timeout=prompt_config.connection_timeout
+            timeout=prompt_config.connection_timeout,
+            cache_ttl=prompt_config.prompt_cache_ttl
         )
     
     async def initialize(self):
@@ -81,6 +86,40 @@ class PromptEngineService:
         response = await self.engine.process_prompt(request)
         return response.model_dump()
 
+    async def _get_stage_data(self, stage_id: int) -> PromptData:
+        """
+        Stage row for stage_id, cached in-process for cache_ttl seconds.
+        Rows only change when the prompt table is edited.
+        """
+        if not self._initialized:
+            raise PromptEngineError("Service not initialized")
+        
+        now = time.monotonic()
+        cached = self._stage_data_cache.get(stage_id)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        self.logger.debug("Stage cache miss for stage_id %s", stage_id)
+        prompt_data = await self.db_manager.get_prompt_by_stage_id(stage_id)
+        self._stage_data_cache[stage_id] = (now + self.cache_ttl, prompt_data)
+        return prompt_data
+
+    async def render_stage_prompt(self, stage_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Same response as process_dict_request, rendered from the cached stage row
+        instead of querying the prompt table on every call
+        """
+        prompt_data = await self._get_stage_data(stage_id)
+        # The template processor fills missing variables into the dict it is given
+        response = await self.engine.build_response(prompt_data, dict(data))
+        return response.model_dump()
+
+    async def get_stage_prompt(self, stage_id: int) -> Dict[str, Any]:
+        """
+        Process a request with empty data for the given stage, served from the stage cache
+        """
+        return await self.render_stage_prompt(stage_id, {})
+
     # FIXED: Add the missing method
     async def get_prompt_by_stage(self, stage_id: int, flow_type: str = None) -> PromptData:
         """
@@ -93,6 +132,10 @@ class PromptEngineService:
         Returns:
             PromptData object
         """
+        # Without a flow_type filter this is the same row the stage cache holds
+        if not flow_type:
+            return await self._get_stage_data(stage_id)
+        
         if not self._initialized:
             raise PromptEngineError("Service not initialized")
         
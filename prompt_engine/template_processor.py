@@ -1,8 +1,19 @@
 import re
-from typing import Dict, Any, List
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
 from .exceptions import InvalidDataError
 
 
+_SINGLE_BRACE_VAR = re.compile(r'\{([\w-]+)\}')
+_DOUBLE_BRACE_VAR = re.compile(r'\{\{([\w-]+)\}\}')
+
+
+@lru_cache(maxsize=128)
+def _template_variables(template: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Single- and double-brace variables of a template. Templates come from the small, cached prompt table."""
+    return tuple(_SINGLE_BRACE_VAR.findall(template)), tuple(_DOUBLE_BRACE_VAR.findall(template))
+
+
 class TemplateProcessor:
     """Async template processor for variable substitution"""
     
@@ -15,8 +26,7 @@ class TemplateProcessor:
         if not template:
             return ""
         
-        single_brace_vars = re.findall(r'\{([\w-]+)\}', template)
-        double_brace_vars = re.findall(r'\{\{([\w-]+)\}\}', template)
+        single_brace_vars, double_brace_vars = _template_variables(template)
         
         all_variables = list(set(single_brace_vars + double_brace_vars))
         
@@ -62,8 +72,7 @@ class TemplateProcessor:
         if not template:
             return []
         
-        single_brace_vars = re.findall(r'\{([\w-]+)\}', template)
-        double_brace_vars = re.findall(r'\{\{([\w-]+)\}\}', template)
+        single_brace_vars, double_brace_vars = _template_variables(template)
         
         all_variables = list(set(single_brace_vars + double_brace_vars))
         return all_variables
\ No newline at end of file
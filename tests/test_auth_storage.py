@@ -0,0 +1,95 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.auth.storage import AuthStorage, new_user_otps
+
+
+class _FakeQuery:
+    def __init__(self, token):
+        self.token = token
+
+    def filter(self, *args):
+        return self
+
+    def first(self):
+        return self.token
+
+
+class _FakeSession:
+    def __init__(self, token):
+        self.token = token
+        self.deleted = []
+
+    def query(self, model):
+        return _FakeQuery(self.token)
+
+    def delete(self, obj):
+        self.deleted.append(obj)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class VerifyExistingUserOTPTest(unittest.TestCase):
+    """otp_tokens.created_at is timestamptz, so the database hands back aware datetimes."""
+
+    def _verify(self, created_at, otp="123456"):
+        token = SimpleNamespace(otp="123456", created_at=created_at)
+        return AuthStorage().verify_for_existing_user(uuid.uuid4(), otp, _FakeSession(token))
+
+    def test_fresh_aware_otp_verifies(self):
+        status, _ = self._verify(datetime.now(timezone.utc) - timedelta(seconds=30))
+        self.assertEqual(status, "SUCCESS")
+
+    def test_old_aware_otp_expires(self):
+        status, _ = self._verify(datetime.now(timezone.utc) - timedelta(minutes=4))
+        self.assertEqual(status, "EXPIRED")
+
+    def test_naive_utc_otp_still_verifies(self):
+        status, _ = self._verify(datetime.utcnow() - timedelta(seconds=30))
+        self.assertEqual(status, "SUCCESS")
+
+    def test_wrong_otp_is_invalid(self):
+        status, _ = self._verify(datetime.now(timezone.utc), otp="000000")
+        self.assertEqual(status, "INVALID")
+
+
+class NewUserOTPTest(unittest.TestCase):
+    """New-user OTPs are held in memory until the account is created."""
+
+    contact = "someone@example.com"
+
+    def tearDown(self):
+        new_user_otps.clear()
+
+    def test_stored_otp_verifies(self):
+        storage = AuthStorage()
+        self.assertTrue(storage.store_for_new_user(self.contact, "123456"))
+        self.assertEqual(storage.verify_for_new_user(self.contact, "123456")[0], True)
+
+    def test_resend_within_a_minute_is_rate_limited(self):
+        storage = AuthStorage()
+        self.assertTrue(storage.store_for_new_user(self.contact, "123456"))
+        self.assertFalse(storage.store_for_new_user(self.contact, "654321"))
+
+    def test_old_otp_expires(self):
+        new_user_otps[self.contact] = {"otp": "123456", "created_at": datetime.now(timezone.utc) - timedelta(minutes=4)}
+        self.assertEqual(AuthStorage().verify_for_new_user(self.contact, "123456")[0], False)
+
+    def test_cleanup_drops_old_entries(self):
+        new_user_otps["old@example.com"] = {"otp": "1", "created_at": datetime.now(timezone.utc) - timedelta(minutes=6)}
+        new_user_otps["naive@example.com"] = {"otp": "2", "created_at": datetime.utcnow() - timedelta(minutes=6)}
+        new_user_otps[self.contact] = {"otp": "3", "created_at": datetime.now(timezone.utc)}
+        session = _FakeSession(None)
+        session.query = lambda model: SimpleNamespace(filter=lambda *args: SimpleNamespace(delete=lambda: 0))
+        self.assertEqual(AuthStorage().cleanup_expired_otps(session), 2)
+        self.assertEqual(list(new_user_otps), [self.contact])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+import uuid
+from types import SimpleNamespace
+
+from app.handlers.turn_replay import TurnReplayCache
+from app.schemas import MessageRequest, MessageResponse
+
+
+class TurnReplayCacheTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.cache = TurnReplayCache(SimpleNamespace(replay_ttl=300, replay_cache_size=16))
+        self.chat_id = uuid.uuid4()
+        self.reflection_id = uuid.uuid4()
+        self.calls = 0
+
+    def _request(self, message="yes", client_message_id="m1"):
+        return MessageRequest(reflection_id=self.reflection_id, message=message, client_message_id=client_message_id)
+
+    async def _process(self, success=True):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        return MessageResponse(success=success, sarthi_message=f"reply {self.calls}", next_stage=self.calls)
+
+    async def test_retry_replays_the_first_response(self):
+        first = await self.cache.run(self.chat_id, self._request(), self._process)
+        retry = await self.cache.run(self.chat_id, self._request(), self._process)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(retry, first)
+
+    async def test_same_text_with_a_new_id_is_processed(self):
+        await self.cache.run(self.chat_id, self._request(client_message_id="m1"), self._process)
+        second = await self.cache.run(self.chat_id, self._request(client_message_id="m2"), self._process)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(second.sarthi_message, "reply 2")
+
+    async def test_without_an_id_every_message_is_processed(self):
+        await self.cache.run(self.chat_id, self._request(client_message_id=None), self._process)
+        await self.cache.run(self.chat_id, self._request(client_message_id=None), self._process)
+        self.assertEqual(self.calls, 2)
+
+    async def test_reused_id_with_different_content_is_processed(self):
+        await self.cache.run(self.chat_id, self._request(message="yes"), self._process)
+        second = await self.cache.run(self.chat_id, self._request(message="no"), self._process)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(second.sarthi_message, "reply 2")
+
+    async def test_ids_are_scoped_to_the_chat(self):
+        await self.cache.run(self.chat_id, self._request(), self._process)
+        await self.cache.run(uuid.uuid4(), self._request(), self._process)
+        self.assertEqual(self.calls, 2)
+
+    async def test_double_submit_shares_one_run(self):
+        first, second = await asyncio.gather(
+            self.cache.run(self.chat_id, self._request(), self._process),
+            self.cache.run(self.chat_id, self._request(), self._process),
+        )
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(first, second)
+
+    async def test_failed_response_is_not_replayed(self):
+        await self.cache.run(self.chat_id, self._request(), lambda: self._process(success=False))
+        retry = await self.cache.run(self.chat_id, self._request(), self._process)
+        self.assertEqual(self.calls, 2)
+        self.assertTrue(retry.success)
+
+    async def test_waiter_processes_when_the_first_submission_is_cancelled(self):
+        first = asyncio.create_task(self.cache.run(self.chat_id, self._request(), self._process))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(self.cache.run(self.chat_id, self._request(), self._process))
+        await asyncio.sleep(0)
+        first.cancel()
+        response = await second
+        self.assertEqual(self.calls, 2)
+        self.assertTrue(response.success)
+
+
+if __name__ == "__main__":
+    unittest.main()